@@ -1,7 +1,7 @@
 import os
 import json
-from flask import Blueprint, jsonify, request
-from app.services.sdn_service import SDNService
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app.services.sdn_service import SDNService, StaleCursorError, LIST_PAGE_SIZE
 from urllib.parse import unquote
 
 # Initialize Blueprint for SDN Routes
@@ -12,45 +12,143 @@ def health_check():
     """Check if the SDN service is healthy."""
     return jsonify({"status": "ok"})
 
+def _list_arguments():
+    """Read the filter and projection arguments shared by the list modes."""
+    filters = {name: request.args.get(name) for name in ("type", "program", "country", "source")}
+    fields = [field.strip() for field in request.args.get("fields", "").split(",") if field.strip()]
+    return filters, fields or None
+
+def _number_arg(name, parse=int, default=None):
+    """Read a numeric query argument; a malformed value is an error rather than the default."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return parse(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be {'an integer' if parse is int else 'a number'}, got: {value}")
+
 @sdn_blueprint.route("/list", methods=["GET"])
 def get_sdn_list():
-    """Get the full SDN list."""
+    """Get the SDN list.
+
+    - ``format=ndjson`` streams one entry per line straight from the index;
+    - ``limit`` / ``cursor`` return one page with a ``next_cursor``;
+    - otherwise the whole list is streamed as a JSON array, as before.
+
+    ``fields`` (comma separated) projects entries and ``type``, ``program``,
+    ``country`` and ``source`` filter them in every mode.
+    """
     try:
-        if SDNService.is_cache_valid():
-            with open(SDNService.CACHE_FILE_PATH, "r") as cache_file:
-                sdn_entries = json.load(cache_file)
-        else:
-            sdn_entries = SDNService.parse_xml_to_json()
-        return jsonify(sdn_entries)
+        filters, fields = _list_arguments()
+
+        if "limit" in request.args or "cursor" in request.args:
+            limit = _number_arg("limit", default=LIST_PAGE_SIZE)
+            return jsonify(SDNService.list_page(request.args.get("cursor"), limit, filters, fields))
+
+        entries = SDNService.iter_entries(SDNService.get_index(), filters=filters, fields=fields)
+
+        if request.args.get("format") == "ndjson":
+            def generate_ndjson():
+                for _, entry in entries:
+                    yield json.dumps(entry) + "\n"
+            return Response(stream_with_context(generate_ndjson()), mimetype="application/x-ndjson")
+
+        def generate_array():
+            yield "["
+            for i, (_, entry) in enumerate(entries):
+                yield (", " if i else "") + json.dumps(entry)
+            yield "]"
+        return Response(stream_with_context(generate_array()), mimetype="application/json")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except StaleCursorError as e:
+        return jsonify({"status": "error", "message": str(e)}), 410
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @sdn_blueprint.route("/search", methods=["GET"])
 def search_sdn():
-    """Search the SDN list with given criteria."""
+    """Search the SDN list with given criteria.
+
+    ``limit`` returns only the best matches and ``min_score`` drops weaker
+    ones; ``match_count`` in the response counts every match. ``type``,
+    ``program``, ``country`` and ``source`` (comma separated values) limit
+    which entries are screened.
+
+    ``id`` (with an optional ``id_type`` such as ``inn``, ``bic`` or ``bik``)
+    screens an identifier by exact lookup instead of a name query.
+    """
     try:
+        id_number = request.args.get('id', '').strip()
+        if id_number:
+            return jsonify(SDNService.search_by_identifier(id_number, request.args.get('id_type')))
+
         query = unquote(request.args.get('query', '')).strip()
         if not query:
             return jsonify({"average_match_score": 0.0, "results": []})
 
-        result = SDNService.search_sdn(query)
+        filters, _ = _list_arguments()
+        result = SDNService.search_sdn(
+            query,
+            limit=_number_arg('limit'),
+            min_score=_number_arg('min_score', float),
+            filters=filters,
+        )
         return jsonify(result)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@sdn_blueprint.route("/search/cache-stats", methods=["GET"])
+def search_cache_stats():
+    """Get hit/miss counters of the SDN search result cache."""
+    return jsonify(SDNService.search_cache_stats())
+
+@sdn_blueprint.route("/search-batch", methods=["POST"])
+def search_sdn_batch():
+    """Screen a list of names in one request."""
+    if not request.is_json:
+        return jsonify({"status": "error", "message": "Content-Type must be application/json"}), 400
+
+    # A body that is not valid JSON is a client error, not a BadRequest caught as a 500 below
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "The request body must be a JSON object"}), 400
+
+    try:
+        queries = data.get("queries")
+        return jsonify(SDNService.search_sdn_batch(queries))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @sdn_blueprint.route("/update", methods=["POST"])
 def update_sdn_list():
-    """Update the SDN list from the source."""
+    """Update the sanctions lists from their sources (``source`` limits it to some, comma separated)."""
+    try:
+        sources = [name for name in request.args.get("source", "").split(",") if name.strip()]
+        result = SDNService.update_from_source(blocking=False, sources=sources or None)
+        if result["status"] == "busy":
+            return jsonify(result), 409
+        if result["status"] == "error":
+            return jsonify(result), 500
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@sdn_blueprint.route("/deltas", methods=["GET"])
+def get_sdn_deltas():
+    """Get the recorded SDN list deltas (uids added, removed and changed per update)."""
     try:
-        download_result = SDNService.download_sdn_file()
-        if download_result["status"] == "error":
-            return jsonify(download_result), 500
-        
-        sdn_entries = SDNService.parse_xml_to_json()
-        return jsonify({
-            "status": "success",
-            "message": "SDN list updated successfully",
-            "entries_count": len(sdn_entries)
-        })
+        limit = _number_arg("limit", default=10)
+        since = request.args.get("since")
+        return jsonify(SDNService.get_deltas(limit=limit, since=since))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -1,11 +1,22 @@
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, Response, request, jsonify, abort, stream_with_context
 
 from app.services.swift_service import (
     extract_mt103_data,
-    extract_transaction_reference,
     save_to_database,
 )
 
+from app.services.swift_ingest import process_mt103_stream, summarize_results
+
+from app.services.swift_query import (
+    LIST_PAGE_SIZE,
+    LOOKUP_FIELDS,
+    iter_query_rows,
+    list_messages_page,
+    list_messages_query,
+    lookup_messages,
+    search_messages,
+)
+
 from app.services.company_service import (
     search_orginfo,
     fetch_company_details_orginfo,
@@ -14,36 +25,84 @@ from app.services.company_service import (
 
 from app.utils import get_db_connection
 
+import json
+
 import sqlite3
 
 
 swift_blueprint = Blueprint("swift_blueprint", __name__)
 
 
+def _int_arg(name, default=None):
+
+    # type=int would silently fall back to the default on a malformed value
+
+    value = request.args.get(name)
+
+    if value is None:
+
+        return default
+
+    try:
+
+        return int(value)
+
+    except ValueError:
+
+        raise ValueError(f"{name} must be an integer, got: {value}")
+
+
 @swift_blueprint.route("/parsed-swift-files", methods=["GET"])
 def get_parsed_files():
 
+    # - limit / cursor return one page (ordered by id) with a next_cursor;
+    # - format=ndjson streams one message per line straight from the cursor;
+    # - otherwise all messages are streamed as a JSON array, as before.
+    # fields (comma separated) projects the columns; date_from / date_to and
+    # status (comma separated) filter in every mode.
+
+    fields = [field.strip() for field in request.args.get("fields", "").split(",") if field.strip()]
+
+    query = {
+        "fields": fields or None,
+        "date_from": request.args.get("date_from"),
+        "date_to": request.args.get("date_to"),
+        "statuses": request.args.get("status", "").split(","),
+    }
+
     try:
 
-        conn = get_db_connection()
+        if "limit" in request.args or "cursor" in request.args:
 
-        cursor = conn.cursor()
+            limit = _int_arg("limit", LIST_PAGE_SIZE)
 
-        cursor.execute("SELECT * FROM swift_messages")
+            return jsonify(list_messages_page(request.args.get("cursor"), limit, **query))
 
-        rows = cursor.fetchall()
+        rows = iter_query_rows(*list_messages_query(**query))
 
-        parsed_files = [dict(row) for row in rows]
+        if request.args.get("format") == "ndjson":
 
-        return jsonify(parsed_files)
+            def generate_ndjson():
+                for row in rows:
+                    yield json.dumps(row) + "\n"
 
-    except sqlite3.Error as e:
+            return Response(stream_with_context(generate_ndjson()), mimetype="application/x-ndjson")
 
-        return jsonify({"error": str(e)}), 500
+        def generate_array():
+            yield "["
+            for i, row in enumerate(rows):
+                yield (", " if i else "") + json.dumps(row)
+            yield "]"
 
-    finally:
+        return Response(stream_with_context(generate_array()), mimetype="application/json")
 
-        conn.close()
+    except ValueError as e:
+
+        return jsonify({"error": str(e)}), 400
+
+    except sqlite3.Error as e:
+
+        return jsonify({"error": str(e)}), 500
 
 
 @swift_blueprint.route("/process-swift", methods=["POST"])
@@ -84,6 +143,33 @@ def process_swift():
         return jsonify({"error": str(e)}), 500
 
 
+@swift_blueprint.route("/process-swift-file", methods=["POST"])
+def process_swift_file():
+
+    # Either a multipart upload in "file" or the batch file as the raw body
+    upload = request.files.get("file")
+
+    stream = upload.stream if upload else request.stream
+
+    try:
+
+        results = list(process_mt103_stream(stream))
+
+        if not results:
+
+            raise ValueError("The file contains no SWIFT messages.")
+
+        return jsonify({"results": results, "summary": summarize_results(results)})
+
+    except ValueError as e:
+
+        return jsonify({"error": str(e)}), 400
+
+    except Exception as e:
+
+        return jsonify({"error": str(e)}), 500
+
+
 @swift_blueprint.route("/search-orginfo", methods=["GET"])
 def api_search_orginfo():
 
@@ -137,15 +223,92 @@ def search_swift():
 
     try:
 
-        result = extract_transaction_reference(reference)
+        result = search_messages({"transaction_reference": [reference]}, limit=1)
+
+        if result:
+
+            return jsonify(result[0])
 
-        return jsonify(result) if result else jsonify({"error": "Not found"}), 404
+        return jsonify({"error": "Not found"}), 404
 
     except Exception as e:
 
         return jsonify({"error": str(e)}), 500
 
 
+@swift_blueprint.route("/search-messages", methods=["GET"])
+def search_swift_messages():
+
+    # Every given field must match; a field may list several values,
+    # repeated or comma separated (?sender_inn=1,2&date_from=2024-01-01)
+    criteria = {
+        field: [value for values in request.args.getlist(field) for value in values.split(",")]
+        for field in LOOKUP_FIELDS
+        if field in request.args
+    }
+
+    try:
+
+        limit = _int_arg("limit")
+
+        messages = search_messages(
+            criteria,
+            date_from=request.args.get("date_from"),
+            date_to=request.args.get("date_to"),
+            limit=limit,
+        )
+
+        return jsonify({"results": messages, "count": len(messages)})
+
+    except ValueError as e:
+
+        return jsonify({"error": str(e)}), 400
+
+    except sqlite3.Error as e:
+
+        return jsonify({"error": str(e)}), 500
+
+
+@swift_blueprint.route("/lookup-messages", methods=["POST"])
+def lookup_swift_messages():
+
+    if not request.is_json:
+
+        abort(400, description="Content-Type must be application/json")
+
+    data = request.json
+
+    if not isinstance(data, dict):
+
+        return jsonify({"error": "The request body must be a JSON object"}), 400
+
+    try:
+
+        keys = data.get("keys")
+
+        if not isinstance(keys, list):
+
+            raise ValueError("keys must be a non-empty list")
+
+        result = lookup_messages(
+            data.get("field", ""),
+            keys,
+            date_from=data.get("date_from"),
+            date_to=data.get("date_to"),
+            limit=data.get("limit"),
+        )
+
+        return jsonify(result)
+
+    except ValueError as e:
+
+        return jsonify({"error": str(e)}), 400
+
+    except sqlite3.Error as e:
+
+        return jsonify({"error": str(e)}), 500
+
+
 @swift_blueprint.route("/update-status/<string:id>", methods=["PATCH"])
 def update_status(id):
 
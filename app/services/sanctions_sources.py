@@ -0,0 +1,276 @@
+import csv
+import os
+from abc import ABC, abstractmethod
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterator, List, Optional
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def canonical_id_type(id_type: str) -> str:
+    """Map a list-specific document type onto the id_type names used by the OFAC list."""
+    lowered = (id_type or '').lower()
+    if re.search(r'\b(inn|tin)\b|tax', lowered):
+        return "Tax ID No."
+    if re.search(r'\b(swift|bic)\b', lowered):
+        return "SWIFT/BIC"
+    if re.search(r'\bbik\b', lowered):
+        return "BIK (RU)"
+    return id_type or ""
+
+
+class SanctionsSource(ABC):
+    """One sanctions list: where it comes from and how to parse it into entries.
+
+    Entries use the cached SDN entry layout plus a ``source`` tag; uids are
+    prefixed with the source name so they stay unique in the shared index.
+    ``location`` is an http(s) URL or a local file path.
+    """
+
+    name = ""
+    default_url: Optional[str] = None
+    file_extension = "xml"
+
+    def __init__(self, location: Optional[str] = None):
+        self.location = location or os.getenv(f"SANCTIONS_{self.name}_URL") or self.default_url
+
+    @property
+    def is_remote(self) -> bool:
+        return bool(self.location) and self.location.startswith(("http://", "https://"))
+
+    def looks_valid(self, head: bytes) -> bool:
+        """Cheap sanity check on the first bytes of a download."""
+        return head.lstrip(b'\xef\xbb\xbf \r\n\t').startswith(b'<')
+
+    @abstractmethod
+    def iter_entries(self, path: str) -> Iterator[Dict[str, Any]]:
+        """Yield the entries of the list file at ``path``, one at a time where the format allows."""
+
+    def _entry(self, uid: str, name: str, entry_type: str) -> Dict[str, Any]:
+        return {
+            'uid': f"{self.name}:{uid}",
+            'name': name,
+            'type': entry_type,
+            'aka_names': [],
+            'addresses': [],
+            'programs': [],
+            'ids': [],
+            'remarks': "",
+            'source': self.name,
+        }
+
+
+class OFACSource(SanctionsSource):
+    """The OFAC SDN list. Its uids stay unprefixed, as they were before other lists existed."""
+
+    name = "OFAC"
+
+    def __init__(self, location: Optional[str] = None):
+        from app.services.sdn_service import SDN_URL
+        super().__init__(location or SDN_URL)
+
+    def looks_valid(self, head: bytes) -> bool:
+        return head.strip().startswith(b'<?xml')
+
+    def iter_entries(self, path: str) -> Iterator[Dict[str, Any]]:
+        from app.services.sdn_service import SDNService
+        return SDNService.iter_xml_entries(path)
+
+
+class EUSource(SanctionsSource):
+    """EU consolidated financial sanctions list (FSF XML 1.1).
+
+    The download URL carries a personal token, so it has no default and must
+    be set through ``SANCTIONS_EU_URL``.
+    """
+
+    name = "EU"
+    ENTRY_TYPES = {"person": "Individual", "enterprise": "Entity"}
+
+    def iter_entries(self, path: str) -> Iterator[Dict[str, Any]]:
+        root = None
+        for event, element in ET.iterparse(path, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = element
+                continue
+            if _local_name(element.tag) == "sanctionEntity":
+                yield self._parse_entity(element)
+                root.clear()
+
+    def _parse_entity(self, element) -> Dict[str, Any]:
+        entry = self._entry(element.get("logicalId", ""), "", "")
+        names = []
+        for child in element:
+            tag = _local_name(child.tag)
+            if tag == "nameAlias":
+                whole_name = child.get("wholeName") or " ".join(
+                    part for part in (child.get("firstName"), child.get("middleName"), child.get("lastName")) if part
+                )
+                if whole_name and whole_name not in names:
+                    names.append(whole_name)
+            elif tag == "subjectType":
+                entry['type'] = self.ENTRY_TYPES.get(child.get("code", ""), child.get("code", ""))
+            elif tag == "regulation":
+                programme = child.get("programme")
+                if programme and programme not in entry['programs']:
+                    entry['programs'].append(programme)
+            elif tag == "address":
+                entry['addresses'].append({"city": child.get("city", ""), "country": child.get("countryDescription", "")})
+            elif tag == "identification":
+                entry['ids'].append({
+                    "id_type": canonical_id_type(child.get("identificationTypeDescription")
+                                                 or child.get("identificationTypeCode", "")),
+                    "id_number": child.get("number", ""),
+                })
+            elif tag == "birthdate" and 'date_of_birth' not in entry:
+                entry['date_of_birth'] = child.get("birthdate") or child.get("year", "")
+            elif tag == "remark" and child.text:
+                entry['remarks'] = child.text.strip()
+        if names:
+            entry['name'], entry['aka_names'] = names[0], names[1:]
+        return entry
+
+
+class UNSource(SanctionsSource):
+    """UN Security Council consolidated list (XML)."""
+
+    name = "UN"
+    default_url = "https://scsanctions.un.org/resources/xml/en/consolidated.xml"
+    ENTRY_TYPES = {"INDIVIDUAL": "Individual", "ENTITY": "Entity"}
+    NAME_FIELDS = ("FIRST_NAME", "SECOND_NAME", "THIRD_NAME", "FOURTH_NAME")
+
+    def iter_entries(self, path: str) -> Iterator[Dict[str, Any]]:
+        # Records sit one level down (INDIVIDUALS / ENTITIES), so the open
+        # elements are tracked to clear each record from its own parent
+        open_elements = []
+        for event, element in ET.iterparse(path, events=("start", "end")):
+            if event == "start":
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            if element.tag in self.ENTRY_TYPES:
+                yield self._parse_record(element)
+                if open_elements:
+                    open_elements[-1].clear()
+
+    @staticmethod
+    def _text(element, path: str) -> str:
+        found = element.find(path)
+        return (found.text or "").strip() if found is not None and found.text else ""
+
+    def _parse_record(self, element) -> Dict[str, Any]:
+        kind = element.tag
+        name = " ".join(filter(None, (self._text(element, field) for field in self.NAME_FIELDS)))
+        entry = self._entry(self._text(element, "DATAID"), name, self.ENTRY_TYPES[kind])
+
+        list_type = self._text(element, "UN_LIST_TYPE")
+        if list_type:
+            entry['programs'].append(list_type)
+        for alias in element.findall(f"{kind}_ALIAS"):
+            alias_name = self._text(alias, "ALIAS_NAME")
+            if alias_name:
+                entry['aka_names'].append(alias_name)
+        for address in element.findall(f"{kind}_ADDRESS"):
+            city, country = self._text(address, "CITY"), self._text(address, "COUNTRY")
+            if city or country:
+                entry['addresses'].append({"city": city, "country": country})
+        for document in element.findall("INDIVIDUAL_DOCUMENT"):
+            number = self._text(document, "NUMBER")
+            if number:
+                entry['ids'].append({
+                    "id_type": canonical_id_type(self._text(document, "TYPE_OF_DOCUMENT")),
+                    "id_number": number,
+                })
+        birth = element.find("INDIVIDUAL_DATE_OF_BIRTH")
+        if birth is not None:
+            entry['date_of_birth'] = self._text(birth, "DATE") or self._text(birth, "YEAR")
+        entry['remarks'] = self._text(element, "COMMENTS1")
+        return entry
+
+
+class UKSource(SanctionsSource):
+    """UK OFSI consolidated list (CSV, one row per name, grouped by Group ID)."""
+
+    name = "UK"
+    default_url = "https://ofsistorage.blob.core.windows.net/publishlive/2022format/ConList.csv"
+    file_extension = "csv"
+    ENTRY_TYPES = {"Individual": "Individual", "Entity": "Entity", "Ship": "Vessel"}
+
+    def looks_valid(self, head: bytes) -> bool:
+        return bool(head.strip()) and not head.lstrip(b'\xef\xbb\xbf \r\n\t').startswith(b'<')
+
+    def iter_entries(self, path: str) -> Iterator[Dict[str, Any]]:
+        # Rows of one group are not guaranteed to be adjacent, so groups are
+        # collected first; the list holds a few thousand groups.
+        groups: Dict[str, Dict[str, Any]] = {}
+        primary_named = set()
+        with open(path, 'r', encoding='utf-8-sig', newline='') as csv_file:
+            reader = csv.reader(csv_file)
+            header: List[str] = []
+            for row in reader:
+                if "Group ID" in row:
+                    header = row
+                    break
+            for row in reader:
+                record = dict(zip(header, row))
+                group_id = record.get("Group ID")
+                if group_id:
+                    self._add_row(groups, primary_named, group_id, record)
+        return iter(groups.values())
+
+    def _add_row(self, groups: Dict[str, Dict[str, Any]], primary_named: set, group_id: str,
+                 record: Dict[str, str]):
+        name = " ".join(filter(None, (record.get(f"Name {i}", "").strip() for i in (1, 2, 3, 4, 5, 6))))
+        entry = groups.get(group_id)
+        if entry is None:
+            group_type = record.get("Group Type", "")
+            entry = groups[group_id] = self._entry(group_id, "", self.ENTRY_TYPES.get(group_type, group_type))
+
+        # Alias rows can come before the primary name row; the first name seen
+        # stands in until then and becomes an alias
+        if name and record.get("Alias Type", "").lower() == "primary name" and group_id not in primary_named:
+            primary_named.add(group_id)
+            if entry['name'] and entry['name'] != name:
+                entry['aka_names'].insert(0, entry['name'])
+            if name in entry['aka_names']:
+                entry['aka_names'].remove(name)
+            entry['name'] = name
+        elif name and not entry['name']:
+            entry['name'] = name
+        elif name and name != entry['name'] and name not in entry['aka_names']:
+            entry['aka_names'].append(name)
+
+        regime = record.get("Regime", "").strip()
+        if regime and regime not in entry['programs']:
+            entry['programs'].append(regime)
+        country = record.get("Country", "").strip()
+        address = {"city": record.get("Address 6", "").strip(), "country": country}
+        if country and address not in entry['addresses']:
+            entry['addresses'].append(address)
+        for column, id_type in (("Passport Number", "Passport"),
+                                ("National Identification Number", "National ID No.")):
+            number = record.get(column, "").strip()
+            if number and {"id_type": id_type, "id_number": number} not in entry['ids']:
+                entry['ids'].append({"id_type": id_type, "id_number": number})
+        if record.get("DOB") and 'date_of_birth' not in entry:
+            entry['date_of_birth'] = record["DOB"].strip()
+        if record.get("Other Information") and not entry['remarks']:
+            entry['remarks'] = record["Other Information"].strip()
+
+
+SOURCE_TYPES = {source.name: source for source in (OFACSource, EUSource, UNSource, UKSource)}
+
+
+def configured_sources(names: List[str]) -> List[SanctionsSource]:
+    """Instantiate the named sources, in order; unknown names raise ValueError."""
+    sources = []
+    for name in names:
+        source_type = SOURCE_TYPES.get(name.strip().upper())
+        if source_type is None:
+            raise ValueError(f"Unknown sanctions source: {name}")
+        sources.append(source_type())
+    return sources
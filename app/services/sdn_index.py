@@ -0,0 +1,219 @@
+import codecs
+import json
+import re
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from unidecode import unidecode
+from app.services.sdn_ngram import NGramIndex, KIND_NAME, KIND_AKA, KIND_ID, MATCH_TRANSLITERATION
+
+# Identifier types that take part in screening
+SCREENING_ID_TYPES = {"Tax ID No.", "SWIFT/BIC", "BIK (RU)"}
+
+# Entry attributes with a posting list per value, used to filter before scoring
+FILTER_ATTRIBUTES = ("type", "program", "country", "source")
+
+CACHE_READ_CHUNK_SIZE = 1024 * 1024
+_WHITESPACE = re.compile(r'\s*')
+
+# Short names accepted by the identifier lookup API
+ID_TYPE_ALIASES = {
+    "inn": "Tax ID No.",
+    "tax_id": "Tax ID No.",
+    "bic": "SWIFT/BIC",
+    "swift": "SWIFT/BIC",
+    "bik": "BIK (RU)",
+}
+
+
+class EntryKeys(NamedTuple):
+    """Pre-normalized match keys for one SDN entry."""
+    name: str
+    aka_names: List[str]
+    id_numbers: List[str]
+
+
+def normalize_key(value: str) -> str:
+    """Normalize a name or identifier the same way queries are compared."""
+    return unidecode(value.lower())
+
+
+def normalize_identifier(value: str) -> str:
+    """Compact form of an ID number: letters and digits only, upper case."""
+    return re.sub(r'[^0-9A-Z]', '', unidecode(value or '').upper())
+
+
+def identifier_keys(id_number: str) -> List[str]:
+    """Lookup keys for an ID number; 11-character BICs also match their 8-character head office code."""
+    compact = normalize_identifier(id_number)
+    if not compact:
+        return []
+    if len(compact) == 11 and compact.isalnum() and compact[:6].isalpha():
+        return [compact, compact[:8]]
+    return [compact]
+
+
+def entry_attribute_keys(entry: Dict[str, Any]) -> set:
+    """``attribute:value`` keys (lower case) under which an entry is filterable."""
+    keys = {f"type:{(entry.get('type') or '').lower()}", f"source:{entry.get('source', 'OFAC').lower()}"}
+    keys.update(f"program:{(program or '').lower()}" for program in entry.get('programs', []))
+    keys.update(f"country:{(address.get('country') or '').lower()}" for address in entry.get('addresses', []))
+    return keys
+
+
+def build_normalized_fields(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the ``normalized`` block stored next to an entry in the cache."""
+    return {
+        "name": normalize_key(entry.get('name', '')),
+        "aka_names": [normalize_key(aka) for aka in entry.get('aka_names', [])],
+        "id_numbers": [normalize_key(id_info['id_number']) for id_info in entry.get('ids', [])
+                       if id_info['id_type'] in SCREENING_ID_TYPES],
+    }
+
+
+def iter_cache_entries(path: str, digest=None) -> Iterator[Dict[str, Any]]:
+    """Stream the entries of a JSON cache file (a JSON array of objects) one at a time.
+
+    Only one read chunk and the entry being decoded are held in memory.
+    ``digest`` (a hashlib object), if given, is fed the raw file bytes, so
+    the caller ends up with the content hash the list is versioned by.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer, position = "", 0
+    expected = "["  # "[", then "{" or "]", then "," or "]", then "{" after a ","
+    with open(path, 'rb') as cache_file:
+        at_end = False
+        while not at_end:
+            chunk = cache_file.read(CACHE_READ_CHUNK_SIZE)
+            at_end = not chunk
+            if digest is not None:
+                digest.update(chunk)
+            buffer = buffer[position:] + text_decoder.decode(chunk, final=at_end)
+            position = 0
+            while True:
+                position = _WHITESPACE.match(buffer, position).end()
+                if position == len(buffer):
+                    break
+                char = buffer[position]
+                if char not in expected:
+                    raise ValueError(f"Malformed SDN cache file {path}: unexpected {char!r}")
+                if char == "{":
+                    try:
+                        entry, position = decoder.raw_decode(buffer, position)
+                    except ValueError:
+                        if at_end:
+                            raise
+                        break  # The entry continues in the next chunk
+                    yield entry
+                    expected = ",]"
+                    continue
+                position += 1
+                expected = {"[": "{]", ",": "{", "]": ""}[char]
+    if expected:
+        raise ValueError(f"Truncated SDN cache file {path}")
+
+
+class SDNIndex:
+    """Immutable, in-memory view of one version of the SDN list.
+
+    Workers do not hold one: ``SDNService.get_index`` serves the
+    ``MappedSDNIndex`` subclass, which reads the same structures from the
+    snapshot file. This class builds the match keys and postings that
+    ``SnapshotWriter`` stores; an empty one stands in until a list exists.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], version: str):
+        self.keys: List[EntryKeys] = []
+        self.ngrams = NGramIndex()
+        self.identifiers: Dict[str, array] = {}
+        self.attributes: Dict[str, array] = {}
+        for position, entry in enumerate(entries):
+            self.keys.append(self.index_entry(position, entry))
+        self.entries = entries
+        self.version = version
+        self.loaded_at = datetime.now()
+
+    def index_entry(self, position: int, entry: Dict[str, Any]) -> EntryKeys:
+        """Add one entry's match keys and postings; its ``normalized`` block is popped."""
+        # Keys are precomputed at build time; older caches are normalized here once
+        normalized = entry.pop('normalized', None) or build_normalized_fields(entry)
+        keys = EntryKeys(normalized['name'], normalized['aka_names'], normalized['id_numbers'])
+        self.ngrams.add(keys.name, position, KIND_NAME)
+        for aka in keys.aka_names:
+            self.ngrams.add(aka, position, KIND_AKA)
+        for id_number in keys.id_numbers:
+            self.ngrams.add(id_number, position, KIND_ID)
+        for id_info in entry.get('ids', []):
+            for id_key in identifier_keys(id_info.get('id_number')):
+                posting = self.identifiers.setdefault(id_key, array('I'))
+                if not posting or posting[-1] != position:
+                    posting.append(position)
+        for attribute_key in entry_attribute_keys(entry):
+            self.attributes.setdefault(attribute_key, array('I')).append(position)
+        return keys
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def empty(cls) -> "SDNIndex":
+        """Return an index with no entries (used when no cache exists yet)."""
+        return cls([], version="empty")
+
+    def candidate_positions(self, query: str, query_tokens: List[str], threshold: float) -> Optional[List[int]]:
+        """Entry positions that can possibly match ``query``, in list order.
+
+        Covers both ways an entry matches: every query token contained in one
+        key, or a similarity ratio of at least ``threshold``. Returns None when
+        the query has no token long enough to index and a full scan is needed.
+        """
+        exact_keys = self.ngrams.substring_candidates(query_tokens)
+        if exact_keys is None:
+            return None
+
+        key_entry = self.ngrams.key_entry
+        positions = {key_entry[key_id] for key_id in exact_keys}
+        positions.update(key_entry[key_id] for key_id in self.ngrams.similar_candidates(query, threshold))
+        return sorted(positions)
+
+    def variant_matches(self, query_tokens: List[str]) -> Dict[int, str]:
+        """Entry positions whose name or an alias matches by transliteration/phonetic keys."""
+        key_entry = self.ngrams.key_entry
+        matches: Dict[int, str] = {}
+        for key_id, match_type in self.ngrams.phonetic_candidates(query_tokens).items():
+            position = key_entry[key_id]
+            if matches.get(position) != MATCH_TRANSLITERATION:
+                matches[position] = match_type
+        return matches
+
+    def filter_positions(self, filters: Dict[str, List[str]]) -> Optional[List[int]]:
+        """Positions of entries matching every attribute in ``filters`` (any of its values).
+
+        Values are compared case-insensitively; returns None when there is
+        nothing to filter on.
+        """
+        selected = None
+        for attribute, values in filters.items():
+            matching = set()
+            for value in values:
+                matching.update(self.attributes.get(f"{attribute}:{value.lower()}", ()))
+            selected = matching if selected is None else selected & matching
+        return sorted(selected) if selected is not None else None
+
+    def lookup_identifier(self, id_number: str, id_type: Optional[str] = None) -> List[int]:
+        """Entry positions holding ``id_number`` (optionally of ``id_type``), via the hash index."""
+        query_keys = identifier_keys(id_number)
+        positions = set()
+        for id_key in query_keys:
+            positions.update(self.identifiers.get(id_key, ()))
+        if id_type is None:
+            return sorted(positions)
+
+        matching = []
+        for position in sorted(positions):
+            for id_info in self.entries[position].get('ids', []):
+                if id_info.get('id_type') == id_type and set(identifier_keys(id_info.get('id_number'))) & set(query_keys):
+                    matching.append(position)
+                    break
+        return matching
@@ -0,0 +1,171 @@
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.services.sdn_phonetic import name_keys, translit_key, phonetic_key, MIN_PHONETIC_KEY_LENGTH
+from app.services.sdn_scoring import required_matches
+
+NGRAM_SIZE = 3
+KIND_NAME = 0
+KIND_AKA = 1
+KIND_ID = 2
+
+MATCH_TRANSLITERATION = "transliteration"
+MATCH_PHONETIC = "phonetic"
+
+
+def tagged_ngrams(text: str, q: int = NGRAM_SIZE) -> List[str]:
+    """Return the q-grams of ``text``, each tagged with its occurrence number.
+
+    Tagging repeated grams ("abc0", "abc1", ...) turns multiset intersection
+    into plain set intersection, which is what the similarity bound needs.
+    """
+    seen: Dict[str, int] = defaultdict(int)
+    grams = []
+    for i in range(len(text) - q + 1):
+        gram = text[i:i + q]
+        grams.append(f"{gram}{seen[gram]}")
+        seen[gram] += 1
+    return grams
+
+
+def min_shared_ngrams(len_a: int, len_b: int, threshold: float, q: int = NGRAM_SIZE) -> int:
+    """Lower bound on shared q-grams for two strings whose ratio can reach ``threshold``.
+
+    M in ``SequenceMatcher.ratio()`` is no larger than the longest common
+    subsequence, so a ratio of at least ``threshold`` needs an LCS of at
+    least ``m = required_matches(len_a, len_b, threshold)``. Every unmatched
+    character of one string destroys at most q of its q-grams, and every
+    unmatched character of the other destroys at most q-1, which leaves the
+    bound below. A result <= 0 means the q-gram filter cannot prune this
+    pair of lengths.
+    """
+    m = required_matches(len_a, len_b, threshold)
+    if m > min(len_a, len_b):
+        return len_a + len_b  # Unreachable: no pair of these lengths can match
+    bound_a = (len_a - q + 1) - q * (len_a - m) - (q - 1) * (len_b - m)
+    bound_b = (len_b - q + 1) - q * (len_b - m) - (q - 1) * (len_a - m)
+    return max(bound_a, bound_b)
+
+
+def length_can_match(len_a: int, len_b: int, threshold: float) -> bool:
+    """Length-only upper bound on the ratio (``real_quick_ratio``)."""
+    return required_matches(len_a, len_b, threshold) <= min(len_a, len_b)
+
+
+class NGramIndex:
+    """Inverted index from tagged character q-grams to normalized SDN keys.
+
+    Each key (primary name, alias or screening ID number) gets a key id;
+    ``key_entry`` maps it back to its entry position, ``key_kind`` tells
+    which field it came from and ``key_length`` avoids touching the string.
+    Names and aliases are also indexed by their per-token transliteration
+    (``t:``) and phonetic (``p:``) keys in ``phonetic_postings``.
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.key_entry = array('I')
+        self.key_kind = array('B')
+        self.key_length = array('I')
+        self.postings: Dict[str, array] = {}
+        self.keys_by_length: Dict[int, array] = {}
+        self.phonetic_postings: Dict[str, array] = {}
+
+    def add(self, text: str, entry_position: int, kind: int):
+        key_id = len(self.keys)
+        self.keys.append(text)
+        self.key_entry.append(entry_position)
+        self.key_kind.append(kind)
+        self.key_length.append(len(text))
+        for gram in tagged_ngrams(text):
+            self.postings.setdefault(gram, array('I')).append(key_id)
+        if kind != KIND_ID:
+            self.keys_by_length.setdefault(len(text), array('I')).append(key_id)
+            token_keys = set()
+            for translit, phonetic in name_keys(text):
+                token_keys.add(f"t:{translit}")
+                if len(phonetic) >= MIN_PHONETIC_KEY_LENGTH:
+                    token_keys.add(f"p:{phonetic}")
+            for token_key in token_keys:
+                self.phonetic_postings.setdefault(token_key, array('I')).append(key_id)
+
+    def substring_candidates(self, tokens: List[str]) -> Optional[Iterable[int]]:
+        """Key ids that may contain every token, or None when no token can be indexed.
+
+        A key containing a token contains every tagged q-gram of that token,
+        so the shortest posting list among them is a complete candidate set.
+        """
+        best = None
+        for token in tokens:
+            for gram in tagged_ngrams(token):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    return ()
+                if best is None or len(posting) < len(best):
+                    best = posting
+        return best
+
+    def similar_candidates(self, query: str, threshold: float) -> Set[int]:
+        """Name/alias key ids whose ratio against ``query`` can reach ``threshold``."""
+        query_length = len(query)
+        query_grams = tagged_ngrams(query)
+        candidates: Set[int] = set()
+        min_bound = None
+        indexed_lengths = set()
+
+        for length, key_ids in self.keys_by_length.items():
+            if not length_can_match(query_length, length, threshold):
+                continue
+            bound = min_shared_ngrams(query_length, length, threshold)
+            if bound <= 0:
+                # Too short for the q-gram filter to prove anything: scan the bucket
+                candidates.update(key_ids)
+            else:
+                indexed_lengths.add(length)
+                min_bound = bound if min_bound is None else min(min_bound, bound)
+
+        if min_bound is None or min_bound > len(query_grams):
+            return candidates
+
+        # Prefix filter: a key sharing at least min_bound grams must appear in
+        # one of the (len - min_bound + 1) rarest query gram posting lists.
+        postings = sorted((self.postings.get(gram, ()) for gram in query_grams), key=len)
+        key_kind = self.key_kind
+        key_length = self.key_length
+        for posting in postings[:len(query_grams) - min_bound + 1]:
+            for key_id in posting:
+                if key_kind[key_id] != KIND_ID and key_length[key_id] in indexed_lengths:
+                    candidates.add(key_id)
+        return candidates
+
+    def _intersect(self, token_keys: List[str]) -> Set[int]:
+        postings = sorted((self.phonetic_postings.get(token_key, ()) for token_key in token_keys), key=len)
+        if not postings or not postings[0]:
+            return set()
+        key_ids = set(postings[0])
+        for posting in postings[1:]:
+            key_ids.intersection_update(posting)
+            if not key_ids:
+                break
+        return key_ids
+
+    def phonetic_candidates(self, tokens: List[str]) -> Dict[int, str]:
+        """Name/alias key ids holding every query token as a spelling variant.
+
+        Transliteration-key matches win over looser phonetic-key matches.
+        Both are pure hash lookups: no per-key comparison happens here.
+        """
+        tokens = [token for token in tokens if translit_key(token)]
+        if not tokens:
+            return {}
+
+        matches = {}
+        translit_keys = [translit_key(token) for token in tokens]
+        phonetic_keys = [phonetic_key(token) for token in tokens]
+        if all(len(key) >= MIN_PHONETIC_KEY_LENGTH for key in phonetic_keys):
+            for key_id in self._intersect([f"p:{key}" for key in phonetic_keys]):
+                matches[key_id] = MATCH_PHONETIC
+        for key_id in self._intersect([f"t:{key}" for key in translit_keys]):
+            matches[key_id] = MATCH_TRANSLITERATION
+        return matches
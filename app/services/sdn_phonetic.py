@@ -0,0 +1,72 @@
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+from unidecode import unidecode
+
+# Spelling variants produced by the Russian/Uzbek romanization schemes we see
+# in MT103 party fields (BGN/PCGN, ISO 9, passport, Uzbek Latin, ad-hoc).
+# Applied in order, so longer clusters must come first.
+TRANSLIT_RULES = [
+    (r"shch|sch|shh", "sh"),
+    (r"tch", "ch"),
+    (r"dzh|dj|zh", "j"),
+    (r"kh|x", "h"),
+    (r"ck|q", "k"),
+    (r"ph", "f"),
+    (r"w", "v"),
+    (r"tz|ts", "c"),
+    (r"[yi]u", "u"),
+    (r"[yi]a", "a"),
+    (r"[yi]e", "e"),
+    (r"[yi]o", "o"),
+    (r"iy|yy|ij|yi|ii", "i"),
+    (r"y", "i"),
+    (r"ou|oo", "u"),
+    (r"ee", "i"),
+    (r"ff$", "v"),
+    (r"(.)\1+", r"\1"),
+]
+_TRANSLIT_PATTERNS = [(re.compile(pattern), replacement) for pattern, replacement in TRANSLIT_RULES]
+_NON_LETTERS = re.compile(r"[^a-z]+")
+_VOWELS = re.compile(r"[aeiou]")
+_REPEATS = re.compile(r"(.)\1+")
+
+# Skeletons shorter than this match far too many names to be useful
+MIN_PHONETIC_KEY_LENGTH = 3
+# Name tokens repeat heavily across a list, so their keys are memoized
+TOKEN_KEY_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=TOKEN_KEY_CACHE_SIZE)
+def translit_key(token: str) -> str:
+    """Canonical spelling of one name token across transliteration schemes."""
+    token = _NON_LETTERS.sub("", unidecode(token).lower())
+    for pattern, replacement in _TRANSLIT_PATTERNS:
+        token = pattern.sub(replacement, token)
+    return token
+
+
+def phonetic_key(token: str) -> str:
+    """Metaphone-style consonant skeleton of a token (first letter kept).
+
+    ``Mukhammad``, ``Muhammad`` and ``Mohammed`` all reduce to ``mhmd``;
+    ``Abdullaev``, ``Abdulloev`` and ``Abdullayev`` to ``abdlv``.
+    """
+    return _skeleton(translit_key(token))
+
+
+def _skeleton(key: str) -> str:
+    if not key:
+        return ""
+    return _REPEATS.sub(r"\1", key[0] + _VOWELS.sub("", key[1:]))
+
+
+def name_keys(text: str) -> List[Tuple[str, str]]:
+    """``(translit_key, phonetic_key)`` for every usable token of a name."""
+    keys = []
+    for token in text.split():
+        translit = translit_key(token)
+        if translit:
+            keys.append((translit, _skeleton(translit)))
+    return keys
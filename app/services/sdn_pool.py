@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.services.sdn_snapshot import MappedSDNIndex
+
+# Snapshot-backed index opened by each pool process, reopened on version change
+_worker_index: Optional[MappedSDNIndex] = None
+
+
+class StaleShardError(Exception):
+    """Raised in a pool process whose snapshot no longer holds the requested version."""
+
+
+def _open_worker_index(path: str, version: str) -> MappedSDNIndex:
+    global _worker_index
+    if _worker_index is None or _worker_index.version != version:
+        _worker_index = MappedSDNIndex(path)
+    if _worker_index.version != version:
+        raise StaleShardError(f"Snapshot {path} no longer holds version {version}")
+    return _worker_index
+
+
+def _screen_shard(path: str, version: str, query: str, threshold: float, limit: Optional[int],
+                  positions: Sequence[int], variants: Dict[int, str]) -> Dict[str, Any]:
+    """Pool task: screen one shard of candidate positions against the mapped snapshot."""
+    from app.services.sdn_service import SDNService
+
+    index = _open_worker_index(path, version)
+    return SDNService._screen_partial(index, query, threshold, limit, positions, variants)
+
+
+class ScreeningPool:
+    """Screens SDN queries on several cores by sharding candidate positions.
+
+    Pool processes map the same snapshot file as the parent, so the index is
+    shared through the page cache instead of being pickled per call; only
+    the query, the shard's positions and its matches cross process
+    boundaries. Queries with fewer than ``min_candidates`` candidates are not
+    worth the round trip and are left to the caller.
+    """
+
+    def __init__(self, workers: int, min_candidates: int):
+        self.workers = workers
+        self.min_candidates = min_candidates
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily, and again after a fork, so every server process owns its pool
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def can_screen(self, index, candidate_count: int) -> bool:
+        return isinstance(index, MappedSDNIndex) and candidate_count >= self.min_candidates
+
+    def screen(self, index: MappedSDNIndex, query: str, threshold: float, limit: Optional[int],
+               positions: Sequence[int], variants: Dict[int, str]) -> List[Dict[str, Any]]:
+        """Screen ``positions`` in contiguous shards; partial results come back in shard order."""
+        executor = self._get_executor()
+        shard_size = -(-len(positions) // self.workers)
+        futures = []
+        for start in range(0, len(positions), shard_size):
+            shard = positions[start:start + shard_size]
+            members = shard if isinstance(shard, range) else set(shard)
+            shard_variants = {position: match for position, match in variants.items() if position in members}
+            futures.append(executor.submit(
+                _screen_shard, index.path, index.version, query, threshold, limit, shard, shard_variants
+            ))
+        try:
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            # Start a fresh pool on the next call instead of failing forever
+            with self._lock:
+                self._executor = None
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,72 @@
+import logging
+import os
+import threading
+import time
+
+from app.services.sdn_service import SDNService
+
+logger = logging.getLogger(__name__)
+
+REFRESH_CHECK_INTERVAL_SECONDS = int(os.getenv("SDN_REFRESH_CHECK_INTERVAL", 300))
+REFRESH_RETRY_SECONDS = int(os.getenv("SDN_REFRESH_RETRY_SECONDS", 900))
+
+
+class SDNRefresher:
+    """Keeps the SDN list fresh from a daemon thread, off the request path.
+
+    Every worker may start one, but refreshes are serialized through the
+    host-wide lock in ``SDNService.update_from_source``: whoever gets it
+    downloads and rebuilds, the others see a fresh cache on their next check.
+    New versions become visible to requests through the atomic snapshot
+    rename, so handlers keep serving the previous version until then. A
+    snapshot left older than the JSON cache is rebuilt here as well.
+    """
+
+    _thread = None
+    _start_lock = threading.Lock()
+    _stop_event = threading.Event()
+    _last_attempt = 0.0
+
+    @staticmethod
+    def start():
+        """Start the refresher thread for this process (idempotent)."""
+        with SDNRefresher._start_lock:
+            if SDNRefresher._thread is not None and SDNRefresher._thread.is_alive():
+                return
+            SDNRefresher._stop_event.clear()
+            SDNRefresher._thread = threading.Thread(
+                target=SDNRefresher._run, name="sdn-refresher", daemon=True
+            )
+            SDNRefresher._thread.start()
+            logger.info("SDN background refresher started")
+
+    @staticmethod
+    def stop():
+        SDNRefresher._stop_event.set()
+
+    @staticmethod
+    def refresh_if_stale():
+        """Run one update if the cache has expired and the retry back-off allows it."""
+        if SDNService.rebuild_stale_snapshot():
+            logger.info("Rebuilt the SDN snapshot from a newer JSON cache")
+        if SDNService.is_cache_valid():
+            return None
+        if time.monotonic() - SDNRefresher._last_attempt < REFRESH_RETRY_SECONDS and SDNRefresher._last_attempt:
+            return None
+
+        SDNRefresher._last_attempt = time.monotonic()
+        result = SDNService.update_from_source(blocking=False)
+        if result["status"] == "error":
+            logger.error(f"Background SDN refresh failed: {result['message']}")
+        elif result["status"] == "success":
+            logger.info(f"Background SDN refresh: {result['message']} (version {result['version']})")
+        return result
+
+    @staticmethod
+    def _run():
+        while not SDNRefresher._stop_event.is_set():
+            try:
+                SDNRefresher.refresh_if_stale()
+            except Exception as e:
+                logger.error(f"Unexpected error in SDN refresher: {e}")
+            SDNRefresher._stop_event.wait(REFRESH_CHECK_INTERVAL_SECONDS)
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class SearchResultCache:
+    """Thread-safe LRU cache of SDN search results with a TTL.
+
+    Keys must include the SDN list version, so a list update makes every
+    older result unreachable without any explicit invalidation.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and time.monotonic() - item[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._entries[key]
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Dict[str, Any]):
+        with self._lock:
+            self._remember(key, value)
+        self._store(key, value)
+
+    def _remember(self, key: Hashable, value: Dict[str, Any]):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "persistent": False,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    # Hooks for a second-level store; the in-memory cache has none
+    def _load(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        return None
+
+    def _store(self, key: Hashable, value: Dict[str, Any]):
+        pass
+
+
+class PersistentSearchResultCache(SearchResultCache):
+    """``SearchResultCache`` backed by a SQLite file shared by all workers.
+
+    Results written by one worker are found by the others and survive
+    restarts; rows from other SDN list versions are dropped on write.
+    Keys are ``(version, ...)`` tuples.
+    """
+
+    def __init__(self, path: str, max_entries: int = 2048, ttl_seconds: float = 3600):
+        super().__init__(max_entries, ttl_seconds)
+        self.path = path
+        self.persistent_hits = 0
+        self._current_version = None
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sdn_search_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _load(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT result, created_at FROM sdn_search_cache WHERE cache_key = ?",
+                    (json.dumps(key),),
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or time.time() - row[1] >= self.ttl_seconds:
+            return None
+        self.persistent_hits += 1
+        return json.loads(row[0])
+
+    def _store(self, key: Hashable, value: Dict[str, Any]):
+        version = key[0]
+        try:
+            with self._connect() as conn:
+                if version != self._current_version:
+                    conn.execute("DELETE FROM sdn_search_cache WHERE version != ?", (version,))
+                    self._current_version = version
+                conn.execute(
+                    "INSERT OR REPLACE INTO sdn_search_cache (cache_key, version, result, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (json.dumps(key), version, json.dumps(value), time.time()),
+                )
+        except sqlite3.Error:
+            # The persistent layer is best effort; the in-memory LRU still works
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({"persistent": True, "persistent_hits": self.persistent_hits, "path": self.path})
+        return stats
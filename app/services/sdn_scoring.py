@@ -0,0 +1,83 @@
+import math
+from collections import Counter
+from difflib import SequenceMatcher
+
+# Slack for float rounding when translating a ratio threshold into integer bounds
+_EPSILON = 1e-9
+
+
+def required_matches(len_a: int, len_b: int, threshold: float) -> int:
+    """Fewest matching characters with which two strings of these lengths reach ``threshold``.
+
+    ``SequenceMatcher.ratio()`` is 2*M/T, so a ratio of at least ``threshold``
+    needs M >= threshold*T/2. Every length and q-gram bound derives from this.
+    """
+    return math.ceil(threshold * (len_a + len_b) / 2 - _EPSILON)
+
+
+class BoundedScorer:
+    """Threshold-aware replacement for ``SequenceMatcher(None, query, key).ratio()``.
+
+    ``score`` returns exactly the ratio difflib would return whenever it is at
+    least ``threshold``, and 0.0 otherwise. Cheap upper bounds are tried in
+    order and the first one that proves the threshold unreachable stops the
+    work:
+
+    1. length bound (``real_quick_ratio``),
+    2. character multiset bound (``quick_ratio``),
+    3. bit-parallel LCS length, abandoned as soon as the remaining characters
+       cannot lift it to the required value.
+
+    Only pairs that survive all three pay for the real ``SequenceMatcher``.
+    """
+
+    def __init__(self, query: str, threshold: float):
+        self.query = query
+        self.threshold = threshold
+        self._length = len(query)
+        self._counts = Counter(query)
+        self._masks = {}
+        for position, char in enumerate(query):
+            self._masks[char] = self._masks.get(char, 0) | (1 << position)
+        self._all_ones = (1 << self._length) - 1
+
+    def _quick_matches(self, key: str) -> int:
+        available = dict(self._counts)
+        matches = 0
+        for char in key:
+            if available.get(char, 0) > 0:
+                available[char] -= 1
+                matches += 1
+        return matches
+
+    def _lcs_reaches(self, key: str, required: int) -> bool:
+        """Bit-parallel LCS (Hyyrö) with an early exit once ``required`` is out of reach."""
+        masks = self._masks
+        all_ones = self._all_ones
+        length = self._length
+        remaining = len(key)
+        row = all_ones
+        for char in key:
+            matched = row & masks.get(char, 0)
+            row = ((row + matched) | (row - matched)) & all_ones
+            remaining -= 1
+            lcs = length - row.bit_count()
+            if lcs >= required:
+                return True
+            if lcs + remaining < required:
+                return False
+        return length - row.bit_count() >= required
+
+    def score(self, key: str) -> float:
+        if self.query == key:
+            return 1.0
+        key_length = len(key)
+        required = required_matches(self._length, key_length, self.threshold)
+        if required > min(self._length, key_length):
+            return 0.0
+        if self._quick_matches(key) < required:
+            return 0.0
+        if not self._lcs_reaches(key, required):
+            return 0.0
+        ratio = SequenceMatcher(None, self.query, key).ratio()
+        return ratio if ratio >= self.threshold else 0.0
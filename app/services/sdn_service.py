@@ -1,3 +1,7 @@
+import hashlib
+import heapq
+from array import array
+from bisect import bisect_left
 import json
 import os
 import requests
@@ -5,9 +9,21 @@ import xml.etree.ElementTree as ET
 import logging
 from unidecode import unidecode
 from datetime import datetime
+from functools import lru_cache
 import re
-from difflib import SequenceMatcher
-from typing import Dict, List, Optional, Any
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any
+from app.services.sanctions_sources import SanctionsSource, configured_sources
+from app.services.sdn_pool import ScreeningPool
+from app.services.sdn_index import SDNIndex, SCREENING_ID_TYPES, ID_TYPE_ALIASES, FILTER_ATTRIBUTES, \
+    build_normalized_fields, normalize_identifier, iter_cache_entries
+from app.services.sdn_ngram import MATCH_TRANSLITERATION, MATCH_PHONETIC
+from app.services.sdn_phonetic import translit_key
+from app.services.sdn_result_cache import SearchResultCache, PersistentSearchResultCache
+from app.services.sdn_scoring import BoundedScorer
+from app.services.sdn_snapshot import MappedSDNIndex, SnapshotWriter, is_compatible_snapshot
+from app.utils import file_lock
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,11 +33,56 @@ logger = logging.getLogger(__name__)
 DATA_DIR = os.path.abspath("./data")
 XML_FILE_PATH = os.path.join(DATA_DIR, "sdn.xml")
 CACHE_FILE_PATH = os.path.join(DATA_DIR, "sdn_cache.json")
-SDN_URL = "https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/SDN.XML"
+SNAPSHOT_FILE_PATH = os.path.join(DATA_DIR, "sdn_index.snap")
+DELTA_LOG_PATH = os.path.join(DATA_DIR, "sdn_deltas.jsonl")
+DOWNLOAD_META_PATH = os.path.join(DATA_DIR, "sdn_download.json")
+SNAPSHOT_META_PATH = os.path.join(DATA_DIR, "sdn_index.meta.json")
+REFRESH_LOCK_PATH = os.path.join(DATA_DIR, "sdn_refresh.lock")
+SOURCES_DIR = os.path.join(DATA_DIR, "sources")  # Downloads of the lists other than OFAC
+SANCTIONS_SOURCES = [name.strip().upper() for name in os.getenv("SANCTIONS_SOURCES", "OFAC").split(",") if name.strip()]
+SDN_URL = os.getenv("SDN_URL", "https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/SDN.XML")
+DOWNLOAD_TIMEOUT = (10, 120)  # (connect, read) seconds
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 CACHE_EXPIRY_HOURS = 24
+INDEX_CHECK_INTERVAL_SECONDS = 5  # How often a worker stats the cache file for changes
+MATCH_THRESHOLD = 0.85
+MAX_BATCH_QUERIES = 500
+# Scores reported for names found only through spelling-variant keys
+# Transliteration matches get their fixed score; phonetic-only matches are scored on their
+# transliteration-folded spelling and capped at theirs
+VARIANT_MATCH_SCORES = {MATCH_TRANSLITERATION: 0.95, MATCH_PHONETIC: 0.9}
+SEARCH_CACHE_SIZE = int(os.getenv("SDN_SEARCH_CACHE_SIZE", 2048))
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SDN_SEARCH_CACHE_TTL", 3600))
+SEARCH_CACHE_PATH = os.getenv("SDN_SEARCH_CACHE_PATH")  # Set to share results across workers and restarts
+SCREENING_WORKERS = int(os.getenv("SDN_SCREENING_WORKERS", 0))  # Above 1 screens large queries in a process pool
+SCREENING_POOL_MIN_CANDIDATES = int(os.getenv("SDN_SCREENING_POOL_MIN_CANDIDATES", 5000))
+LIST_PAGE_SIZE = 500
+LIST_MAX_PAGE_SIZE = 5000
+
+class StaleCursorError(Exception):
+    """Raised when a list cursor was issued for a different SDN list version."""
+
 
 class SDNService:
     CACHE_FILE_PATH = os.path.join(DATA_DIR, "sdn_cache.json")
+
+    # Process-wide resident index, shared by every request in this worker
+    _index: Optional[SDNIndex] = None
+    _index_signature: Optional[tuple] = None
+    _index_checked_at = 0.0
+    _index_lock = threading.Lock()
+
+    # Search results keyed by (list version, query, threshold, limit, filters)
+    _result_cache = (
+        PersistentSearchResultCache(SEARCH_CACHE_PATH, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SECONDS)
+        if SEARCH_CACHE_PATH else SearchResultCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SECONDS)
+    )
+
+    # Optional multi-core screening; small queries always run in-process
+    _screening_pool = (
+        ScreeningPool(SCREENING_WORKERS, SCREENING_POOL_MIN_CANDIDATES) if SCREENING_WORKERS > 1 else None
+    )
+
     @staticmethod
     def calculate_similarity(str1: str, str2: str) -> float:
         """Calculate similarity between two strings."""
@@ -57,207 +118,1002 @@ class SDNService:
         if not os.path.exists(CACHE_FILE_PATH):
             return False
             
+        # Adding or dropping a list needs a rebuild even if the others are fresh
+        if set(SANCTIONS_SOURCES) != set(SDNService.snapshot_source_hashes()):
+            return False
+
         cache_mtime = datetime.fromtimestamp(os.path.getmtime(CACHE_FILE_PATH))
         age_hours = (datetime.now() - cache_mtime).total_seconds() / 3600
         
         return age_hours < CACHE_EXPIRY_HOURS
 
     @staticmethod
-    def download_sdn_file() -> Dict[str, Any]:
-        """Download the SDN XML file with error handling and validation."""
+    def get_index() -> SDNIndex:
+        """Return the resident SDN index, reloading it only when the snapshot changes.
+
+        Workers map the binary snapshot rather than parsing the JSON cache, so
+        the list data is shared through the page cache across processes. The
+        request path never refreshes an expired list or rebuilds a snapshot
+        older than the JSON cache: both are left to ``SDNRefresher`` while the
+        last good version keeps being served. Only a cold start without a
+        usable snapshot builds one here, under the host-wide refresh lock so
+        concurrent workers do not all parse the XML.
+        """
+        index = SDNService._index
+        if index is not None and time.monotonic() - SDNService._index_checked_at < INDEX_CHECK_INTERVAL_SECONDS:
+            return index
+
+        with SDNService._index_lock:
+            # Another thread may have refreshed the index while we waited
+            if (SDNService._index is not None and
+                    time.monotonic() - SDNService._index_checked_at < INDEX_CHECK_INTERVAL_SECONDS):
+                return SDNService._index
+
+            if not is_compatible_snapshot(SNAPSHOT_FILE_PATH):
+                with file_lock(REFRESH_LOCK_PATH):
+                    if not is_compatible_snapshot(SNAPSHOT_FILE_PATH):
+                        if os.path.exists(CACHE_FILE_PATH):
+                            SDNService.build_snapshot()
+                        elif os.path.exists(XML_FILE_PATH):
+                            SDNService.parse_xml_to_json()
+
+            if not is_compatible_snapshot(SNAPSHOT_FILE_PATH):
+                SDNService._index = SDNService._index or SDNIndex.empty()
+            else:
+                stat = os.stat(SNAPSHOT_FILE_PATH)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if SDNService._index is None or signature != SDNService._index_signature:
+                    new_index = MappedSDNIndex(SNAPSHOT_FILE_PATH)
+                    if SDNService._index is None or new_index.version != SDNService._index.version:
+                        logger.info(f"Mapped SDN index version {new_index.version} ({len(new_index)} entries)")
+                        SDNService._index = new_index
+                    SDNService._index_signature = signature
+
+            SDNService._index_checked_at = time.monotonic()
+            return SDNService._index
+
+    @staticmethod
+    def is_snapshot_current() -> bool:
+        """Check that the binary snapshot exists, has the current format and is not older than the JSON cache."""
+        if not is_compatible_snapshot(SNAPSHOT_FILE_PATH):
+            return False
+        if not os.path.exists(CACHE_FILE_PATH):
+            return True
+        return os.path.getmtime(SNAPSHOT_FILE_PATH) >= os.path.getmtime(CACHE_FILE_PATH)
+
+    @staticmethod
+    def build_snapshot(cache_path: str = CACHE_FILE_PATH, snapshot_path: str = SNAPSHOT_FILE_PATH) -> Optional[str]:
+        """Build the binary snapshot from the JSON cache and return its version.
+
+        Cache entries are streamed one at a time into the snapshot writer, so
+        neither the parsed list nor an in-memory index is ever held whole.
+        """
+        if not os.path.exists(cache_path):
+            return None
+        logger.info("Building SDN index snapshot...")
+        digest = hashlib.sha1()
+        with SnapshotWriter(snapshot_path) as writer:
+            for sdn_entry in iter_cache_entries(cache_path, digest):
+                writer.add(sdn_entry)
+            version = digest.hexdigest()[:16]
+            writer.write(version)
+        SDNService.invalidate_index()
+        return version
+
+    @staticmethod
+    def rebuild_stale_snapshot() -> bool:
+        """Rebuild a snapshot older than the JSON cache, unless another process holds the refresh lock.
+
+        Returns True when a snapshot was built.
+        """
+        if SDNService.is_snapshot_current():
+            return False
+        with file_lock(REFRESH_LOCK_PATH, blocking=False) as acquired:
+            if not acquired or SDNService.is_snapshot_current():
+                return False
+            return SDNService.build_snapshot() is not None
+
+    @staticmethod
+    def invalidate_index():
+        """Force the next get_index() call to re-check the snapshot file."""
+        SDNService._index_checked_at = 0.0
+
+    @staticmethod
+    def _read_json_file(path: str) -> Dict[str, Any]:
+        if not os.path.exists(path):
+            return {}
         try:
-            logger.info("Downloading SDN file...")
-            response = requests.get(SDN_URL, timeout=10)
-            response.raise_for_status()
+            with open(path, 'r') as json_file:
+                return json.load(json_file)
+        except (OSError, ValueError):
+            return {}
 
-            if not response.content.strip().startswith(b'<?xml'):
-                raise ValueError("Downloaded content is not valid XML")
+    @staticmethod
+    def download_sdn_file(url: Optional[str] = None, target_path: str = XML_FILE_PATH,
+                          meta_path: str = DOWNLOAD_META_PATH, looks_valid=None) -> Dict[str, Any]:
+        """Download the SDN XML file with error handling and validation.
 
-            os.makedirs(os.path.dirname(XML_FILE_PATH), exist_ok=True)
-            with open(XML_FILE_PATH, 'wb') as file:
-                file.write(response.content)
-            logger.info("SDN file downloaded successfully")
+        Sends the ETag / Last-Modified of the previous download so an unchanged
+        list costs a 304, streams the body to a temporary file while hashing it
+        and renames it into place only once it is complete and looks like XML
+        (or passes ``looks_valid(first_bytes)`` for other list formats).
+        ``changed`` is False when the server answered 304 or the payload hash
+        equals the previous download.
+        """
+        temp_path = f"{target_path}.{os.getpid()}.tmp"
+        try:
+            logger.info(f"Downloading {url or SDN_URL}...")
+            previous = SDNService._read_json_file(meta_path)
+            headers = {}
+            if os.path.exists(target_path):
+                if previous.get("etag"):
+                    headers["If-None-Match"] = previous["etag"]
+                if previous.get("last_modified"):
+                    headers["If-Modified-Since"] = previous["last_modified"]
+
+            with requests.get(url or SDN_URL, headers=headers, stream=True,
+                              timeout=DOWNLOAD_TIMEOUT) as response:
+                if response.status_code == 304:
+                    logger.info("SDN file not modified since last download")
+                    return {"status": "success", "changed": False, "sha256": previous.get("sha256"),
+                            "message": "SDN list not modified"}
+                response.raise_for_status()
+
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                digest = hashlib.sha256()
+                head = b''
+                with open(temp_path, 'wb') as file:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if len(head) < 64:
+                            head += chunk[:64]
+                        digest.update(chunk)
+                        file.write(chunk)
 
-            if os.path.exists(CACHE_FILE_PATH):
-                os.remove(CACHE_FILE_PATH)
-                logger.info("Cache cleared")
+                if looks_valid is not None and not looks_valid(head):
+                    raise ValueError("Downloaded content is not in the expected format")
+                if looks_valid is None and not head.strip().startswith(b'<?xml'):
+                    raise ValueError("Downloaded content is not valid XML")
 
-            return {"status": "success", "message": "SDN list updated successfully"}
+                sha256 = digest.hexdigest()
+                os.replace(temp_path, target_path)
+                with open(meta_path, 'w') as meta_file:
+                    json.dump({
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                        "sha256": sha256,
+                        "downloaded_at": datetime.now().isoformat(),
+                    }, meta_file)
+            logger.info("SDN file downloaded successfully")
+
+            changed = sha256 != previous.get("sha256")
+            return {"status": "success", "changed": changed, "sha256": sha256,
+                    "message": "SDN list updated successfully" if changed else "SDN list content unchanged"}
         except Exception as e:
             logger.error(f"Download error: {str(e)}")
             return {"status": "error", "message": str(e)}
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def mark_cache_fresh():
+        """Reset the cache age after confirming the source list has not changed."""
+        if os.path.exists(CACHE_FILE_PATH):
+            os.utime(CACHE_FILE_PATH)
+        if os.path.exists(SNAPSHOT_FILE_PATH):
+            os.utime(SNAPSHOT_FILE_PATH)
+
+    @staticmethod
+    def snapshot_source_hashes() -> Dict[str, Optional[str]]:
+        """Hash of the payload each list in the current snapshot was built from, by source name."""
+        if not os.path.exists(SNAPSHOT_FILE_PATH):
+            return {}
+        meta = SDNService._read_json_file(SNAPSHOT_META_PATH)
+        if "sources" in meta:
+            return meta["sources"]
+        # Snapshots from before multi-list support only hold the OFAC list
+        return {"OFAC": meta.get("source_sha256")} if meta else {}
+
+    @staticmethod
+    def sanctions_sources() -> List[SanctionsSource]:
+        """The configured lists (``SANCTIONS_SOURCES``), in index order."""
+        return configured_sources(SANCTIONS_SOURCES)
+
+    @staticmethod
+    def fetch_source(source: SanctionsSource) -> Dict[str, Any]:
+        """Make the latest copy of one list available locally.
+
+        Remote lists are downloaded conditionally; a local ``location`` (a
+        fixture, or a file dropped in by another job) is used in place and
+        only hashed. The result carries the ``path`` to parse.
+        """
+        if source.is_remote:
+            if source.name == "OFAC":
+                target_path, meta_path = XML_FILE_PATH, DOWNLOAD_META_PATH
+            else:
+                name = source.name.lower()
+                target_path = os.path.join(SOURCES_DIR, f"{name}.{source.file_extension}")
+                meta_path = os.path.join(SOURCES_DIR, f"{name}.download.json")
+            result = SDNService.download_sdn_file(source.location, target_path, meta_path, source.looks_valid)
+            result["path"] = target_path
+            return result
+
+        if not source.location or not os.path.exists(source.location):
+            return {"status": "error", "message": f"No location configured for the {source.name} list"}
+        return {"status": "success", "path": source.location, "sha256": SDNService._file_sha256(source.location)}
+
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        """SHA-256 of a list file, the same hash a download of it records."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as source_file:
+            for chunk in iter(lambda: source_file.read(DOWNLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
 
     @staticmethod
-    def parse_xml_to_json():
-        """Parses the XML file and saves data to JSON cache."""
+    def _parse_entry_element(entry, namespace: str) -> Dict[str, Any]:
+        """Convert one <sdnEntry> element into the cached entry dict."""
+        sdn_entry = {}
+        sdn_entry['uid'] = entry.find(f"{namespace}uid").text if entry.find(f"{namespace}uid") is not None else ""
+
+        # Extract full name by combining firstName, middleName, and lastName
+        first_name = entry.find(f"{namespace}firstName").text if entry.find(f"{namespace}firstName") is not None else ""
+        middle_name = entry.find(f"{namespace}middleName").text if entry.find(f"{namespace}middleName") is not None else ""
+        last_name = entry.find(f"{namespace}lastName").text if entry.find(f"{namespace}lastName") is not None else ""
+        full_name = " ".join([first_name, middle_name, last_name]).strip()
+        sdn_entry['name'] = full_name
+
+        sdn_entry['type'] = entry.find(f"{namespace}sdnType").text if entry.find(f"{namespace}sdnType") is not None else ""
+        
+        # AKA List (Alternate Names)
+        aka_list = entry.find(f"{namespace}akaList")
+        if aka_list is not None:
+            sdn_entry['aka_names'] = [
+                aka.find(f"{namespace}lastName").text for aka in aka_list.findall(f"{namespace}aka") 
+                if aka.find(f"{namespace}lastName") is not None
+            ]
+
+        # Address List
+        address_list = entry.find(f"{namespace}addressList")
+        if address_list is not None:
+            addresses = []
+            for address in address_list.findall(f"{namespace}address"):
+                city = address.find(f"{namespace}city").text if address.find(f"{namespace}city") is not None else ""
+                country = address.find(f"{namespace}country").text if address.find(f"{namespace}country") is not None else ""
+                addresses.append({"city": city, "country": country})
+            sdn_entry['addresses'] = addresses
+
+        # Program List (Sanctions programs)
+        program_list = entry.find(f"{namespace}programList")
+        if program_list is not None:
+            sdn_entry['programs'] = [
+                program.text for program in program_list.findall(f"{namespace}program") if program is not None
+            ]
+
+        # Date of Birth
+        dob_feature = entry.find(f"{namespace}dateOfBirthList")
+        if dob_feature is not None:
+            dob_item = dob_feature.find(f"{namespace}dateOfBirthItem/{namespace}dateOfBirth")
+            sdn_entry['date_of_birth'] = dob_item.text if dob_item is not None else ""
+
+        # ID List with idType and idNumber
+        id_list = entry.find(f"{namespace}idList")  # Ensure lowercase 'idList' matches XML structure
+        if id_list is not None:
+            ids = []
+            for id_item in id_list.findall(f"{namespace}id"):
+                id_type = id_item.find(f"{namespace}idType").text if id_item.find(f"{namespace}idType") is not None else ""
+                id_number = id_item.find(f"{namespace}idNumber").text if id_item.find(f"{namespace}idNumber") is not None else ""
+                ids.append({"id_type": id_type, "id_number": id_number})
+            sdn_entry['ids'] = ids
+
+        # Remarks
+        remarks = entry.find(f"{namespace}remarks")
+        sdn_entry['remarks'] = remarks.text if remarks is not None else ""
+        sdn_entry['source'] = "OFAC"
+
+        return sdn_entry
+
+    @staticmethod
+    def iter_xml_entries(xml_path: str = XML_FILE_PATH):
+        """Stream entries from an SDN XML file without building the whole tree.
+
+        Each <sdnEntry> is converted as soon as its end tag is seen and then
+        cleared from the root, so memory use stays flat regardless of list size.
+        """
+        namespace = ''
+        root = None
+        for event, element in ET.iterparse(xml_path, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = element
+                    if '}' in root.tag:
+                        namespace = root.tag.split('}')[0] + '}'
+                continue
+            if element.tag == f"{namespace}sdnEntry":
+                yield SDNService._parse_entry_element(element, namespace)
+                root.clear()
+
+    @staticmethod
+    def _write_cache(sdn_entries, cache_path: str = CACHE_FILE_PATH) -> tuple:
+        """Stream entries into the JSON cache and atomically replace it.
+
+        Entries without a ``normalized`` block get one here, so match keys are
+        computed once per list version. Returns ``(entries_count, version)``
+        where the version is the same content hash ``build_snapshot`` uses.
+        """
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        digest = hashlib.sha1()
+        entries_count = 0
         try:
-            print("Parsing XML file to update SDN list...")
-            
             # Ensure the directory for the cache file exists
-            os.makedirs(os.path.dirname(CACHE_FILE_PATH), exist_ok=True)
-            
-            tree = ET.parse(XML_FILE_PATH)
-            root = tree.getroot()
-
-            namespace = ''
-            if '}' in root.tag:
-                namespace = root.tag.split('}')[0] + '}'
-
-            sdn_entries = []
-            for entry in root.findall(f".//{namespace}sdnEntry"):
-                sdn_entry = {}
-                sdn_entry['uid'] = entry.find(f"{namespace}uid").text if entry.find(f"{namespace}uid") is not None else ""
-
-                # Extract full name by combining firstName, middleName, and lastName
-                first_name = entry.find(f"{namespace}firstName").text if entry.find(f"{namespace}firstName") is not None else ""
-                middle_name = entry.find(f"{namespace}middleName").text if entry.find(f"{namespace}middleName") is not None else ""
-                last_name = entry.find(f"{namespace}lastName").text if entry.find(f"{namespace}lastName") is not None else ""
-                full_name = " ".join([first_name, middle_name, last_name]).strip()
-                sdn_entry['name'] = full_name
-
-                sdn_entry['type'] = entry.find(f"{namespace}sdnType").text if entry.find(f"{namespace}sdnType") is not None else ""
-                
-                # AKA List (Alternate Names)
-                aka_list = entry.find(f"{namespace}akaList")
-                if aka_list is not None:
-                    sdn_entry['aka_names'] = [
-                        aka.find(f"{namespace}lastName").text for aka in aka_list.findall(f"{namespace}aka") 
-                        if aka.find(f"{namespace}lastName") is not None
-                    ]
-
-                # Address List
-                address_list = entry.find(f"{namespace}addressList")
-                if address_list is not None:
-                    addresses = []
-                    for address in address_list.findall(f"{namespace}address"):
-                        city = address.find(f"{namespace}city").text if address.find(f"{namespace}city") is not None else ""
-                        country = address.find(f"{namespace}country").text if address.find(f"{namespace}country") is not None else ""
-                        addresses.append({"city": city, "country": country})
-                    sdn_entry['addresses'] = addresses
-
-                # Program List (Sanctions programs)
-                program_list = entry.find(f"{namespace}programList")
-                if program_list is not None:
-                    sdn_entry['programs'] = [
-                        program.text for program in program_list.findall(f"{namespace}program") if program is not None
-                    ]
-
-                # Date of Birth
-                dob_feature = entry.find(f"{namespace}dateOfBirthList")
-                if dob_feature is not None:
-                    dob_item = dob_feature.find(f"{namespace}dateOfBirthItem/{namespace}dateOfBirth")
-                    sdn_entry['date_of_birth'] = dob_item.text if dob_item is not None else ""
-
-                # ID List with idType and idNumber
-                id_list = entry.find(f"{namespace}idList")  # Ensure lowercase 'idList' matches XML structure
-                if id_list is not None:
-                    ids = []
-                    for id_item in id_list.findall(f"{namespace}id"):
-                        id_type = id_item.find(f"{namespace}idType").text if id_item.find(f"{namespace}idType") is not None else ""
-                        id_number = id_item.find(f"{namespace}idNumber").text if id_item.find(f"{namespace}idNumber") is not None else ""
-                        ids.append({"id_type": id_type, "id_number": id_number})
-                    sdn_entry['ids'] = ids
-
-                # Remarks
-                remarks = entry.find(f"{namespace}remarks")
-                sdn_entry['remarks'] = remarks.text if remarks is not None else ""
-
-                sdn_entries.append(sdn_entry)
-
-            # Save the data to a JSON cache file
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+            with open(temp_path, 'w') as cache_file:
+                def write(chunk: str):
+                    cache_file.write(chunk)
+                    digest.update(chunk.encode('utf-8'))
+
+                write('[')
+                for sdn_entry in sdn_entries:
+                    if 'normalized' not in sdn_entry:
+                        # Match keys, normalized once per list version instead of per query
+                        sdn_entry['normalized'] = build_normalized_fields(sdn_entry)
+                    if entries_count:
+                        write(', ')
+                    write(json.dumps(sdn_entry))
+                    entries_count += 1
+                write(']')
+            os.replace(temp_path, cache_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return entries_count, digest.hexdigest()[:16]
+
+    @staticmethod
+    def parse_xml_to_json() -> int:
+        """Parses the XML file and streams the entries into the JSON cache.
+
+        The cache is written to a temporary file and renamed into place, so
+        readers never see a partially written list. The hash of the XML is
+        recorded with the snapshot, so the refresher does not parse the same
+        list again. Returns the number of entries written (0 on failure).
+        """
+        try:
+            print("Parsing XML file to update SDN list...")
+
+            # Save the data to a JSON cache file, one entry at a time
             print("Attempting to write to JSON cache file.")
-            with open(CACHE_FILE_PATH, 'w') as cache_file:
-                json.dump(sdn_entries, cache_file)
+            entries_count, version = SDNService._write_cache(SDNService.iter_xml_entries(XML_FILE_PATH))
             print("Successfully wrote to JSON cache file.")
+            SDNService.build_snapshot()
+            SDNService._write_snapshot_meta(version, {"OFAC": SDNService._file_sha256(XML_FILE_PATH)})
 
-            return sdn_entries
+            return entries_count
         except ET.ParseError as e:
             print(f"XML parsing error: {e}")
-            return []
+            return 0
         except Exception as e:
             print(f"Unexpected error: {e}")
+            return 0
+
+    @staticmethod
+    def _load_current_index() -> SDNIndex:
+        """The index currently on disk, mapped from its snapshot.
+
+        A cache left without a usable snapshot (an older format) is streamed
+        into a new snapshot first, so the list is never loaded whole.
+        """
+        if not is_compatible_snapshot(SNAPSHOT_FILE_PATH) and os.path.exists(CACHE_FILE_PATH):
+            SDNService.build_snapshot()
+        if is_compatible_snapshot(SNAPSHOT_FILE_PATH):
+            return MappedSDNIndex(SNAPSHOT_FILE_PATH)
+        return SDNIndex.empty()
+
+    @staticmethod
+    def _write_snapshot_meta(version: str, hashes: Dict[str, Optional[str]]):
+        """Record which source payloads (by hash) the current snapshot was built from."""
+        with open(SNAPSHOT_META_PATH, 'w') as meta_file:
+            json.dump({"version": version, "source_sha256": hashes.get("OFAC"), "sources": hashes}, meta_file)
+
+    @staticmethod
+    def _content_hash(sdn_entry) -> bytes:
+        """Digest of an entry's fields, independent of key order and of its ``normalized`` block."""
+        fields = {key: value for key, value in sdn_entry.items() if key != 'normalized'}
+        return hashlib.sha1(json.dumps(fields, sort_keys=True).encode('utf-8')).digest()
+
+    @staticmethod
+    def apply_xml_update(xml_path: Optional[str] = None, source_sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Apply a freshly downloaded OFAC SDN XML; see ``apply_sources_update``."""
+        return SDNService.apply_sources_update({"OFAC": xml_path or XML_FILE_PATH}, {"OFAC": source_sha256})
+
+    @staticmethod
+    def apply_sources_update(paths: Dict[str, str],
+                             source_hashes: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, Any]:
+        """Re-parse the lists in ``paths`` and diff the combined list against the current one by uid.
+
+        Only the sources in ``paths`` are parsed again; every other configured
+        list is carried over from the current snapshot as is. The current list
+        is only held as ``uid -> (position, content hash)``: entries are
+        streamed through the diff straight into the cache writer, unchanged
+        ones keep their precomputed match keys, and the snapshot is then built
+        from the new cache in a separate pass. The delta (uids of added,
+        removed and changed entries) is appended to DELTA_LOG_PATH so
+        downstream re-screening can be limited to it.
+        """
+        current = SDNService._load_current_index()
+        current_by_uid = {}
+        positions_by_source: Dict[str, array] = {}
+        for position in range(len(current)):
+            entry = current.entries[position]
+            current_by_uid[entry.get('uid')] = (position, SDNService._content_hash(entry))
+            positions_by_source.setdefault(entry.get('source', "OFAC"), array('I')).append(position)
+
+        def carried_entries(source_name: str):
+            for position in positions_by_source.get(source_name, ()):
+                yield dict(current.entries[position])
+
+        added, changed, seen = [], [], set()
+
+        def merged_entries():
+            for source in SDNService.sanctions_sources():
+                if source.name in paths:
+                    source_entries = source.iter_entries(paths[source.name])
+                else:
+                    source_entries = carried_entries(source.name)
+                for sdn_entry in source_entries:
+                    uid = sdn_entry.get('uid')
+                    seen.add(uid)
+                    previous = current_by_uid.get(uid)
+                    if previous is None:
+                        added.append(uid)
+                    elif previous[1] != SDNService._content_hash(sdn_entry):
+                        changed.append(uid)
+                    else:
+                        sdn_entry['normalized'] = current.keys[previous[0]]._asdict()
+                    yield sdn_entry
+
+        entries_count, version = SDNService._write_cache(merged_entries())
+        removed = [uid for uid in current_by_uid if uid not in seen]
+        current_by_uid.clear()
+        positions_by_source.clear()
+
+        hashes = {name: sha256 for name, sha256 in SDNService.snapshot_source_hashes().items()
+                  if name in SANCTIONS_SOURCES}
+        hashes.update(source_hashes or {})
+
+        SDNService.build_snapshot()
+        SDNService._write_snapshot_meta(version, hashes)
+
+        delta = {
+            "from_version": current.version,
+            "to_version": version,
+            "created_at": datetime.now().isoformat(),
+            "entries_count": entries_count,
+            "sources": sorted(paths),
+            "added": added,
+            "removed": removed,
+            "changed": changed,
+        }
+        if current.version != version:
+            os.makedirs(os.path.dirname(DELTA_LOG_PATH), exist_ok=True)
+            with open(DELTA_LOG_PATH, 'a') as delta_log:
+                delta_log.write(json.dumps(delta) + "\n")
+        logger.info(f"SDN delta {current.version} -> {version} ({', '.join(sorted(paths))}): "
+                    f"{len(added)} added, {len(removed)} removed, {len(changed)} changed")
+        return delta
+
+    @staticmethod
+    def update_from_source(blocking: bool = True, sources: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Fetch the configured lists and apply them as one delta, holding the host-wide refresh lock.
+
+        ``sources`` limits the refresh to those lists; a list whose payload
+        hash matches the one in the current snapshot is not parsed again.
+        Returns ``{"status": "busy"}`` without doing anything when ``blocking``
+        is False and another process is already refreshing.
+        """
+        selected = SDNService.sanctions_sources()
+        if sources:
+            wanted = {name.strip().upper() for name in sources}
+            unknown = wanted - {source.name for source in selected}
+            if unknown:
+                raise ValueError(f"Sources not configured: {', '.join(sorted(unknown))}")
+            selected = [source for source in selected if source.name in wanted]
+
+        with file_lock(REFRESH_LOCK_PATH, blocking=blocking) as acquired:
+            if not acquired:
+                return {"status": "busy", "message": "An SDN update is already in progress"}
+
+            built = SDNService.snapshot_source_hashes()
+            paths, hashes = {}, {}
+            for source in selected:
+                fetch_result = SDNService.fetch_source(source)
+                if fetch_result["status"] == "error":
+                    return {"status": "error", "message": f"{source.name}: {fetch_result['message']}"}
+                sha256 = fetch_result.get("sha256")
+                if not sha256 or sha256 != built.get(source.name):
+                    paths[source.name] = fetch_result["path"]
+                    hashes[source.name] = sha256
+
+            # Lists dropped from SANCTIONS_SOURCES also need a rebuild
+            if not paths and set(built) <= set(SANCTIONS_SOURCES):
+                SDNService.mark_cache_fresh()
+                index = SDNService._load_current_index()
+                return {
+                    "status": "success",
+                    "message": "SDN list is already up to date",
+                    "entries_count": len(index),
+                    "version": index.version,
+                }
+
+            delta = SDNService.apply_sources_update(paths, hashes)
+            return {
+                "status": "success",
+                "message": "SDN list updated successfully",
+                "entries_count": delta["entries_count"],
+                "version": delta["to_version"],
+                "sources": delta["sources"],
+                "delta": {
+                    "added": len(delta["added"]),
+                    "removed": len(delta["removed"]),
+                    "changed": len(delta["changed"]),
+                }
+            }
+
+    @staticmethod
+    def get_deltas(limit: int = 10, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return recorded deltas, newest last, optionally only those after version ``since``."""
+        if limit < 1:
+            raise ValueError("'limit' must be a positive integer")
+        if not os.path.exists(DELTA_LOG_PATH):
             return []
+        with open(DELTA_LOG_PATH, 'r') as delta_log:
+            deltas = [json.loads(line) for line in delta_log if line.strip()]
+        if since is not None:
+            versions = [delta["from_version"] for delta in deltas]
+            if since in versions:
+                deltas = deltas[versions.index(since):]
+        return deltas[-limit:]
+
+    @staticmethod
+    def _clean_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Normalize attribute filters to ``{attribute: [values]}``; a string may list values comma separated."""
+        cleaned = {}
+        for attribute, values in (filters or {}).items():
+            if attribute not in FILTER_ATTRIBUTES:
+                raise ValueError(f"Unknown filter '{attribute}'; expected one of {', '.join(FILTER_ATTRIBUTES)}")
+            if values is None:
+                continue
+            if isinstance(values, str):
+                values = values.split(',')
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                raise ValueError(f"Filter '{attribute}' must be a string or a list of strings")
+            values = sorted({value.strip().lower() for value in values if value.strip()})
+            if values:
+                cleaned[attribute] = values
+        return cleaned
+
+    @staticmethod
+    def iter_entries(index: SDNIndex, start: int = 0, filters: Optional[Dict[str, Any]] = None,
+                     fields: Optional[List[str]] = None):
+        """Yield ``(position, entry)`` pairs from ``start`` on, filtered and projected.
+
+        ``filters`` may hold ``type``, ``program``, ``country`` and ``source``
+        (matched case-insensitively, through the index's attribute postings);
+        ``fields`` limits each entry to those keys.
+        """
+        filters = SDNService._clean_filters(filters)
+        if filters:
+            allowed = index.filter_positions(filters)
+            positions = allowed[bisect_left(allowed, start):]
+        else:
+            positions = range(start, len(index))
+        for position in positions:
+            entry = index.entries[position]
+            if fields:
+                entry = {field: entry[field] for field in fields if field in entry}
+            yield position, entry
 
     @staticmethod
-    def search_sdn(query: str) -> Dict[str, Any]:
-        """Search SDN list with specific criteria."""
+    def list_page(cursor: Optional[str] = None, limit: int = LIST_PAGE_SIZE,
+                  filters: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Return one page of the SDN list.
+
+        Cursors have the form ``<version>:<position>`` so a client paging
+        through the list notices when the underlying version changes.
+        """
+        if not 0 < limit <= LIST_MAX_PAGE_SIZE:
+            raise ValueError(f"'limit' must be between 1 and {LIST_MAX_PAGE_SIZE}")
+
+        index = SDNService.get_index()
+        start = 0
+        if cursor:
+            version, _, position = cursor.rpartition(':')
+            if not position.isdigit():
+                raise ValueError("Invalid cursor")
+            if version != index.version:
+                raise StaleCursorError("Cursor refers to an older SDN list version; restart from the beginning")
+            start = int(position)
+
+        results = []
+        next_cursor = None
+        for position, entry in SDNService.iter_entries(index, start, filters, fields):
+            if len(results) == limit:
+                next_cursor = f"{index.version}:{position}"
+                break
+            results.append(entry)
+
+        return {"version": index.version, "count": len(results), "next_cursor": next_cursor, "results": results}
+
+    @staticmethod
+    def _clean_query(query: str) -> Optional[str]:
+        """Lowercase and strip a raw query; None when there is nothing to search."""
+        query = query.lower().strip()
+        if not query:
+            return None
+        return re.sub(r'\(.*?\)', '', query).replace('"', '').strip()
+
+    @staticmethod
+    def _result_options(threshold: float, limit: Optional[int], min_score: Optional[float]) -> tuple:
+        """Validate result options; ``min_score`` raises the threshold for this search."""
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 1):
+            raise ValueError("'limit' must be a positive integer")
+        for name, value in (("threshold", threshold), ("min_score", min_score)):
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                      or not 0 < value <= 1):
+                raise ValueError(f"'{name}' must be a number in (0, 1]")
+        if min_score is not None:
+            threshold = max(threshold, min_score)
+        return float(threshold), limit
+
+    @staticmethod
+    def search_sdn(query: str, threshold: float = MATCH_THRESHOLD, limit: Optional[int] = None,
+                   min_score: Optional[float] = None, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Search SDN list with specific criteria.
+
+        ``limit`` keeps only the best ``limit`` results; ``match_count`` still
+        reports how many entries matched. ``filters`` (``type``, ``program``,
+        ``country``, ``source``) restrict the entries screened at all.
+        """
         try:
-            query = query.lower().strip()
-            if not query:
+            threshold, limit = SDNService._result_options(threshold, limit, min_score)
+            filters = SDNService._clean_filters(filters)
+            query = SDNService._clean_query(query)
+            if query is None:
                 return {"average_match_score": 0.0, "results": []}
 
-            query = re.sub(r'\(.*?\)', '', query).replace('"', '').strip()
+            return SDNService._screen_cached(SDNService.get_index(), query, threshold, limit, filters)
+
+        except Exception as e:
+            logger.error(f"Error in search_sdn: {str(e)}")
+            raise
+
+    @staticmethod
+    def search_by_identifier(id_number: str, id_type: Optional[str] = None) -> Dict[str, Any]:
+        """Screen an identifier (INN, BIC, BIK, ...) by exact lookup in the identifier index.
+
+        ``id_type`` restricts matches to one ID type; short names such as
+        ``inn``, ``bic`` and ``bik`` are accepted.
+        """
+        if not normalize_identifier(id_number):
+            raise ValueError("'id' must contain letters or digits")
+        if id_type:
+            id_type = ID_TYPE_ALIASES.get(id_type.strip().lower(), id_type.strip())
+
+        index = SDNService.get_index()
+        results = []
+        for position in index.lookup_identifier(id_number, id_type):
+            entry = index.entries[position]
+            results.append({
+                'name': entry['name'],
+                'aka_names': entry.get('aka_names', []),
+                'ids': [id_info for id_info in entry.get('ids', [])
+                        if id_info['id_type'] in SCREENING_ID_TYPES or id_info['id_type'] == id_type],
+                'source': entry.get('source', "OFAC"),
+                'match_score': 1.0,
+                'match_type': "identifier"
+            })
+
+        return {"average_match_score": 1.0 if results else 0.0, "results": results}
+
+    @staticmethod
+    def search_sdn_batch(queries: List[Any]) -> Dict[str, Any]:
+        """Screen many names against one index version in a single call.
 
-            if SDNService.is_cache_valid():
-                with open(CACHE_FILE_PATH, 'r', encoding='utf-8') as cache_file:
-                    sdn_entries = json.load(cache_file)
+        Each item is either a query string or ``{"query": ..., "threshold": ...}``,
+        optionally with ``limit``, ``min_score`` and ``filters`` as in ``search_sdn``.
+        Items that normalize to the same query and options are screened once.
+        """
+        if not isinstance(queries, list) or not queries:
+            raise ValueError("'queries' must be a non-empty list")
+        if len(queries) > MAX_BATCH_QUERIES:
+            raise ValueError(f"At most {MAX_BATCH_QUERIES} queries are allowed per batch")
+
+        started = time.perf_counter()
+        index = SDNService.get_index()
+        screened: Dict[tuple, Dict[str, Any]] = {}
+        results = []
+
+        for item in queries:
+            if isinstance(item, str):
+                item = {"query": item}
+            if not isinstance(item, dict) or not isinstance(item.get("query"), str):
+                raise ValueError("Each query must be a string or an object with a 'query' string")
+            threshold, limit = SDNService._result_options(
+                item.get("threshold", MATCH_THRESHOLD), item.get("limit"), item.get("min_score")
+            )
+            if not isinstance(item.get("filters", {}), dict):
+                raise ValueError("'filters' must be an object")
+            filters = SDNService._clean_filters(item.get("filters"))
+
+            query = SDNService._clean_query(item["query"])
+            key = (query, threshold, limit, SDNService._filters_key(filters))
+            if key not in screened:
+                query_started = time.perf_counter()
+                if query is None:
+                    result = {"average_match_score": 0.0, "results": []}
+                else:
+                    result = dict(SDNService._screen_cached(index, query, threshold, limit, filters))
+                result["elapsed_ms"] = round((time.perf_counter() - query_started) * 1000, 3)
+                screened[key] = result
+
+            results.append({"query": item["query"], "threshold": threshold, **screened[key]})
+
+        return {
+            "sdn_version": index.version,
+            "queries_count": len(queries),
+            "unique_queries_count": len(screened),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+            "results": results,
+        }
+
+    @staticmethod
+    def _filters_key(filters: Dict[str, List[str]]) -> Optional[tuple]:
+        return tuple((attribute, tuple(values)) for attribute, values in sorted(filters.items())) or None
+
+    @staticmethod
+    def _screen_cached(index: SDNIndex, query: str, threshold: float, limit: Optional[int] = None,
+                       filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """``_screen`` behind the result cache; callers must not mutate the result."""
+        key = (index.version, query, threshold, limit, SDNService._filters_key(filters or {}))
+        result = SDNService._result_cache.get(key)
+        if result is None:
+            result = SDNService._screen(index, query, threshold, limit, filters)
+            SDNService._result_cache.put(key, result)
+        return result
+
+    @staticmethod
+    def search_cache_stats() -> Dict[str, Any]:
+        return SDNService._result_cache.stats()
+
+    @staticmethod
+    def _screen(index: SDNIndex, query: str, threshold: float, limit: Optional[int] = None,
+                filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """Screen one cleaned query against an index.
+
+        ``filters`` (already cleaned) are resolved through the attribute
+        postings and intersected with the candidates before any scoring.
+
+        With a ``limit`` only the best ``limit`` matches are kept (in a heap)
+        and scanning stops once that many exact matches are found: nothing can
+        outrank them, and one exact match already fixes the average at 1.0.
+        ``match_count`` is then a lower bound, flagged by ``match_count_exact``;
+        it is the same whether or not the screening pool shards the scan.
+        """
+        query_tokens = [unidecode(token) for token in query.split()]
+
+        positions = index.candidate_positions(query, query_tokens, threshold)
+        if positions is None:
+            positions = range(len(index))
+
+        # Spelling variants come straight from hash lookups on precomputed keys
+        variants = index.variant_matches(query_tokens)
+        if variants:
+            positions = sorted(set(positions).union(variants))
+
+        if filters:
+            allowed = index.filter_positions(filters)
+            if isinstance(positions, range):
+                positions = allowed
             else:
-                sdn_entries = SDNService.parse_xml_to_json()
+                allowed = set(allowed)
+                positions = [position for position in positions if position in allowed]
 
-            results = []
-            total_score = 0
-            match_count = 0
-            has_exact_match = False
+        pool = SDNService._screening_pool
+        partials = None
+        if pool is not None and pool.can_screen(index, len(positions)):
+            try:
+                partials = pool.screen(index, query, threshold, limit, positions, variants)
+            except Exception as e:
+                logger.warning(f"Screening pool failed, screening in-process: {e}")
+        if partials is None:
+            partials = [SDNService._screen_partial(index, query, threshold, limit, positions, variants)]
 
-            query_tokens = [unidecode(token) for token in query.split()]
+        return SDNService._merge_partials(partials, limit)
 
-            for entry in sdn_entries:
-                match_result = SDNService._check_entry_match(entry, query, query_tokens)
-                if match_result["is_match"]:
-                    results.append(match_result["entry_data"])
-                    total_score += match_result["score"]
-                    match_count += 1
-                    if match_result["is_exact"]:
-                        has_exact_match = True
+    @staticmethod
+    def _screen_partial(index: SDNIndex, query: str, threshold: float, limit: Optional[int],
+                        positions, variants: Dict[int, str]) -> Dict[str, Any]:
+        """Screen the given candidate positions; the unit of work of one pool shard.
+
+        Entries are only read for the matches that are kept, once the
+        scan is over, so rejected and displaced candidates cost no decode.
+        With a ``limit``, ``exact_marks`` holds ``(match_count, positions
+        scanned)`` as of each exact match, so ``_merge_partials`` can tell
+        where a single scan over all shards would have stopped.
+        """
+        top: List[tuple] = []  # (score, -position, match_type) min-heap
+        total_score = 0
+        scored_count = 0
+        match_count = 0
+        exact_count = 0
+        exact_marks = []
+        scanned = 0
 
-            average_match_score = 1.0 if has_exact_match else (
-                total_score / match_count if match_count > 0 else 0.0
+        query_tokens = [unidecode(token) for token in query.split()]
+        scorer = BoundedScorer(query, threshold)
+        # Folded name tokens repeat across entries, so their scores are memoized for this query
+        token_scorers = [lru_cache(maxsize=None)(BoundedScorer(key, threshold).score)
+                         for key in map(translit_key, query_tokens) if key]
+
+        for position in positions:
+            if limit is not None and exact_count >= limit:
+                break
+            scanned += 1
+            match_result = SDNService._check_entry_match(
+                index, position, scorer, query_tokens, variants.get(position), token_scorers
             )
+            if match_result["is_match"]:
+                item = (match_result["score"], -position, match_result["match_type"])
+                if limit is None or len(top) < limit:
+                    heapq.heappush(top, item)
+                elif item[:2] > top[0][:2]:
+                    heapq.heapreplace(top, item)
+                # Spelling-variant matches are extra evidence, not part of the average
+                if match_result["match_type"] not in VARIANT_MATCH_SCORES:
+                    total_score += match_result["score"]
+                    scored_count += 1
+                match_count += 1
+                if match_result["is_exact"]:
+                    exact_count += 1
+                    if limit is not None:
+                        exact_marks.append((match_count, scanned))
 
-            results.sort(key=lambda x: x['match_score'], reverse=True)
-            return {"average_match_score": average_match_score, "results": results}
+        return {
+            "top": [(score, negated_position, SDNService._entry_data(index, -negated_position, score, match_type))
+                    for score, negated_position, match_type in top],
+            "total_score": total_score,
+            "scored_count": scored_count,
+            "match_count": match_count,
+            "exact_count": exact_count,
+            "exact_marks": exact_marks,
+            "candidates": len(positions),
+        }
 
-        except Exception as e:
-            logger.error(f"Error in search_sdn: {str(e)}")
-            raise
+    @staticmethod
+    def _merge_partials(partials: List[Dict[str, Any]], limit: Optional[int]) -> Dict[str, Any]:
+        """Combine shard results into one search response.
+
+        Shards are contiguous and in position order, so with a ``limit`` the
+        counts are cut at the ``limit``-th exact match overall, exactly where
+        screening all candidates in one process stops. ``average_match_score``
+        covers exact and fuzzy matches only, as before transliteration and
+        phonetic matching existed.
+        """
+        total_score = sum(partial["total_score"] for partial in partials)
+        scored_count = sum(partial["scored_count"] for partial in partials)
+        match_count = sum(partial["match_count"] for partial in partials)
+        exact_count = sum(partial["exact_count"] for partial in partials)
+        stopped_early = False
+        if limit is not None and exact_count >= limit:
+            match_count = exact_count = 0
+            for shard_number, partial in enumerate(partials):
+                needed = limit - exact_count
+                if partial["exact_count"] >= needed:
+                    shard_match_count, scanned = partial["exact_marks"][needed - 1]
+                    match_count += shard_match_count
+                    exact_count = limit
+                    stopped_early = scanned < partial["candidates"] or shard_number < len(partials) - 1
+                    break
+                match_count += partial["match_count"]
+                exact_count += partial["exact_count"]
+
+        average_match_score = 1.0 if exact_count else (
+            total_score / scored_count if scored_count > 0 else 0.0
+        )
+
+        # Best score first; equal scores keep index order, as a stable sort would
+        top = [item for partial in partials for item in partial["top"]]
+        if limit is not None:
+            top = heapq.nlargest(limit, top, key=lambda item: item[:2])
+        else:
+            top.sort(key=lambda item: item[:2], reverse=True)
+        return {
+            "average_match_score": average_match_score,
+            "match_count": match_count,
+            "match_count_exact": not stopped_early,
+            "results": [entry_data for _, _, entry_data in top],
+        }
 
     @staticmethod
-    def _check_entry_match(entry: Dict, query: str, query_tokens: List[str]) -> Dict:
-        """Helper method to check if an entry matches the search criteria."""
-        THRESHOLD = 0.85
-        ALLOWED_ID_TYPES = {"Tax ID No.", "SWIFT/BIC", "BIK (RU)"}
+    def _check_entry_match(index: SDNIndex, position: int, scorer: BoundedScorer, query_tokens: List[str],
+                           variant_match: Optional[str] = None,
+                           token_scorers: Optional[List[Callable[[str], float]]] = None) -> Dict:
+        """Helper method to check if the entry at ``position`` matches the search criteria.
 
-        entry_name = unidecode(entry['name'].lower())
-        aka_names = [unidecode(aka.lower()) for aka in entry.get('aka_names', [])]
-        ids = [id_info for id_info in entry.get('ids', [])
-               if id_info['id_type'] in ALLOWED_ID_TYPES]
+        Only the precomputed match keys are read; the entry itself (a JSON
+        decode in a mapped index) is left to ``_entry_data``.
+        ``variant_match`` is the transliteration/phonetic match type found for
+        this entry by the index, if any; it only counts when neither the token
+        nor the similarity check matched. A phonetic-only match is re-scored
+        with ``token_scorers``, the score functions of the transliteration-folded
+        query tokens, so a shared consonant skeleton alone does not make a match.
+        """
+        keys = index.keys[position]
+        entry_name = keys.name
+        aka_names = keys.aka_names
 
-        # Calculate similarity scores
-        primary_score = SequenceMatcher(None, query, entry_name).ratio()
-        aka_scores = [SequenceMatcher(None, query, aka).ratio() for aka in aka_names]
+        # Calculate similarity scores (scores below the threshold come back as 0.0)
+        primary_score = scorer.score(entry_name)
+        aka_scores = [scorer.score(aka) for aka in aka_names]
         best_score = max([primary_score] + aka_scores)
 
         is_exact = (
             best_score == 1.0 or
             all(token in entry_name for token in query_tokens) or
             any(all(token in aka for token in query_tokens) for aka in aka_names) or
-            any(all(token in unidecode(id_info['id_number'].lower()) 
-                for token in query_tokens) for id_info in ids)
+            any(all(token in id_number for token in query_tokens)
+                for id_number in keys.id_numbers)
         )
 
-        if best_score >= THRESHOLD or is_exact:
-            return {
-                "is_match": True,
-                "is_exact": is_exact,
-                "score": 1.0 if is_exact else best_score,
-                "entry_data": {
-                    'name': entry['name'],
-                    'aka_names': entry.get('aka_names', []),
-                    'ids': ids,
-                    'match_score': 1.0 if is_exact else best_score
-                }
-            }
+        if is_exact:
+            score, match_type = 1.0, "exact"
+        elif best_score >= scorer.threshold:
+            score, match_type = best_score, "fuzzy"
+        elif variant_match:
+            score, match_type = VARIANT_MATCH_SCORES[variant_match], variant_match
+            if variant_match == MATCH_PHONETIC:
+                score = min(score, SDNService._folded_score(entry_name, aka_names, token_scorers or []))
+            if score < scorer.threshold:
+                score = None
+        else:
+            score = None
+
+        if score is not None:
+            return {"is_match": True, "is_exact": is_exact, "score": score, "match_type": match_type}
 
         return {"is_match": False}
 
+    @staticmethod
+    def _folded_score(entry_name: str, aka_names, token_scorers: List[Callable[[str], float]]) -> float:
+        """Similarity of the folded query tokens to the closest name or alias (0.0 below the threshold).
+
+        Each query token takes its best ratio against the folded tokens of a
+        name, and a name scores as its weakest query token.
+        """
+        if not token_scorers:
+            return 0.0
+        best_score = 0.0
+        for name in [entry_name, *aka_names]:
+            folded = [key for key in map(translit_key, name.split()) if key]
+            name_score = min(max([score(token) for token in folded], default=0.0)
+                             for score in token_scorers)
+            best_score = max(best_score, name_score)
+        return best_score
+
+    @staticmethod
+    def _entry_data(index: SDNIndex, position: int, score: float, match_type: str) -> Dict[str, Any]:
+        """The search result for a matched entry."""
+        entry = index.entries[position]
+        ids = [id_info for id_info in entry.get('ids', [])
+               if id_info['id_type'] in SCREENING_ID_TYPES]
+        return {
+            'name': entry['name'],
+            'aka_names': entry.get('aka_names', []),
+            'ids': ids,
+            'source': entry.get('source', "OFAC"),
+            'match_score': score,
+            'match_type': match_type
+        }
+
 
@@ -0,0 +1,359 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+from app.services.sdn_index import SDNIndex, EntryKeys
+from app.services.sdn_ngram import NGramIndex, KIND_AKA
+
+# File layout (native byte order, every section 8-byte aligned):
+#   header: magic, format version, section count, then (offset, length) per section
+#   sections: see SECTIONS below; *_offsets arrays hold n+1 boundaries into a blob
+MAGIC = b"SDNSNAP1"
+FORMAT_VERSION = 4
+SECTIONS = (
+    "version",
+    "entry_blob", "entry_offsets",
+    "key_blob", "key_offsets", "key_entry", "key_kind", "key_length", "entry_key_start",
+    "gram_blob", "gram_offsets", "posting_offsets", "postings",
+    "length_values", "length_offsets", "length_key_ids",
+    "phonetic_blob", "phonetic_offsets", "phonetic_posting_offsets", "phonetic_postings",
+    "identifier_blob", "identifier_offsets", "identifier_posting_offsets", "identifier_postings",
+    "attribute_blob", "attribute_offsets", "attribute_posting_offsets", "attribute_postings",
+)
+_decode_json = json.JSONDecoder().raw_decode
+_HEADER = struct.Struct("<8sII" + "QQ" * len(SECTIONS))
+_ALIGNMENT = 8
+
+
+class _StringTable(Sequence):
+    """Read-only sequence of strings stored as one UTF-8 blob plus offsets."""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+
+class _JsonTable(_StringTable):
+    """Entries stored as individual JSON documents, decoded on access."""
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        # Each document was written by json.dumps: no encoding sniffing or padding to strip
+        return _decode_json(str(self._blob[self._offsets[i]:self._offsets[i + 1]], 'utf-8'))[0]
+
+
+class _PostingTable:
+    """Sorted gram table with a ``get`` compatible with ``NGramIndex.postings``."""
+
+    def __init__(self, grams: _StringTable, offsets: memoryview, postings: memoryview):
+        self._grams = grams
+        self._offsets = offsets
+        self._postings = postings
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def get(self, gram: str, default=None):
+        i = bisect_left(self._grams, gram)
+        if i < len(self._grams) and self._grams[i] == gram:
+            return self._postings[self._offsets[i]:self._offsets[i + 1]]
+        return default
+
+
+class _EntryKeyTable(Sequence):
+    """Rebuilds ``EntryKeys`` for an entry from its contiguous run of key ids."""
+
+    def __init__(self, keys: _StringTable, key_kind: memoryview, entry_key_start: memoryview):
+        self._blob = keys._blob
+        self._offsets = keys._offsets
+        self._key_kind = key_kind
+        self._entry_key_start = entry_key_start
+
+    def __len__(self) -> int:
+        return len(self._entry_key_start) - 1
+
+    def __getitem__(self, position: int) -> EntryKeys:
+        # Decoded straight from the blob: this runs for every screened candidate
+        blob, offsets, key_kind = self._blob, self._offsets, self._key_kind
+        start = self._entry_key_start[position]
+        end = self._entry_key_start[position + 1]
+        aka_names, id_numbers = [], []
+        for key_id in range(start + 1, end):
+            text = str(blob[offsets[key_id]:offsets[key_id + 1]], 'utf-8')
+            if key_kind[key_id] == KIND_AKA:
+                aka_names.append(text)
+            else:
+                id_numbers.append(text)
+        return EntryKeys(str(blob[offsets[start]:offsets[start + 1]], 'utf-8'), aka_names, id_numbers)
+
+
+class MappedNGramIndex(NGramIndex):
+    """``NGramIndex`` whose arrays live in a memory-mapped snapshot."""
+
+    def __init__(self, keys, key_entry, key_kind, key_length, postings, keys_by_length, phonetic_postings):
+        self.keys = keys
+        self.key_entry = key_entry
+        self.key_kind = key_kind
+        self.key_length = key_length
+        self.postings = postings
+        self.keys_by_length = keys_by_length
+        self.phonetic_postings = phonetic_postings
+
+    def add(self, text: str, entry_position: int, kind: int):
+        raise TypeError("Snapshot-backed indexes are read-only")
+
+
+def is_compatible_snapshot(path: str) -> bool:
+    """Check that ``path`` holds a snapshot this code can map."""
+    try:
+        with open(path, 'rb') as snapshot_file:
+            header = snapshot_file.read(_HEADER.size)
+    except OSError:
+        return False
+    if len(header) < _HEADER.size:
+        return False
+    magic, format_version, section_count = _HEADER.unpack(header)[:3]
+    return magic == MAGIC and format_version == FORMAT_VERSION and section_count == len(SECTIONS)
+
+
+class MappedSDNIndex(SDNIndex):
+    """SDN index served straight from a snapshot file via ``mmap``.
+
+    Every worker that maps the same file shares one physical copy through the
+    page cache, and opening it only parses the fixed-size header.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        header = _HEADER.unpack_from(view, 0)
+        magic, format_version, section_count = header[:3]
+        if magic != MAGIC or format_version != FORMAT_VERSION or section_count != len(SECTIONS):
+            raise ValueError(f"Unsupported SDN snapshot: {path}")
+
+        bounds = header[3:]
+        sections = {
+            name: view[bounds[2 * i]:bounds[2 * i] + bounds[2 * i + 1]]
+            for i, name in enumerate(SECTIONS)
+        }
+
+        def typed(name: str, typecode: str) -> memoryview:
+            return sections[name].cast(typecode)
+
+        keys = _StringTable(sections["key_blob"], typed("key_offsets", 'Q'))
+        key_kind = typed("key_kind", 'B')
+        length_offsets = typed("length_offsets", 'Q')
+        length_key_ids = typed("length_key_ids", 'I')
+        keys_by_length = {
+            length: length_key_ids[length_offsets[i]:length_offsets[i + 1]]
+            for i, length in enumerate(typed("length_values", 'I'))
+        }
+
+        self.entries = _JsonTable(sections["entry_blob"], typed("entry_offsets", 'Q'))
+        self.keys = _EntryKeyTable(keys, key_kind, typed("entry_key_start", 'I'))
+        self.ngrams = MappedNGramIndex(
+            keys,
+            typed("key_entry", 'I'),
+            key_kind,
+            typed("key_length", 'I'),
+            _PostingTable(
+                _StringTable(sections["gram_blob"], typed("gram_offsets", 'Q')),
+                typed("posting_offsets", 'Q'),
+                typed("postings", 'I'),
+            ),
+            keys_by_length,
+            _PostingTable(
+                _StringTable(sections["phonetic_blob"], typed("phonetic_offsets", 'Q')),
+                typed("phonetic_posting_offsets", 'Q'),
+                typed("phonetic_postings", 'I'),
+            ),
+        )
+        self.identifiers = _PostingTable(
+            _StringTable(sections["identifier_blob"], typed("identifier_offsets", 'Q')),
+            typed("identifier_posting_offsets", 'Q'),
+            typed("identifier_postings", 'I'),
+        )
+        self.attributes = _PostingTable(
+            _StringTable(sections["attribute_blob"], typed("attribute_offsets", 'Q')),
+            typed("attribute_posting_offsets", 'Q'),
+            typed("attribute_postings", 'I'),
+        )
+        self.version = bytes(sections["version"]).decode('utf-8')
+        self.loaded_at = datetime.now()
+
+
+def _string_sections(values: List[str]):
+    blob = bytearray()
+    offsets = array('Q', [0])
+    for value in values:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return bytes(blob), offsets
+
+
+def _grouped_sections(groups: Dict[Any, Sequence[int]], keys: List[Any]):
+    offsets = array('Q', [0])
+    values = array('I')
+    for key in keys:
+        values.extend(groups[key])
+        offsets.append(len(values))
+    return offsets, values
+
+
+def _table_sections(build, count: int) -> list:
+    """Producers of the ``count`` sections of one table, all from a single ``build()`` call.
+
+    The sections of a table are adjacent in the file, so ``build`` runs when
+    the first one is written and its result is released with the last.
+    """
+    built = []
+
+    def producer(i: int):
+        def produce() -> bytes:
+            if not built:
+                built.append(build())
+            section = built[0][i]
+            if i == count - 1:
+                built.clear()
+            return section
+        return produce
+
+    return [producer(i) for i in range(count)]
+
+
+def _entry_json(entry: Dict[str, Any]) -> bytes:
+    return json.dumps(entry, ensure_ascii=False).encode('utf-8')
+
+
+class SnapshotWriter:
+    """Builds a snapshot from entries added one at a time, e.g. streamed from the cache.
+
+    Entry JSON is spooled to a temporary file next to the snapshot; only the
+    match keys and posting lists are held in memory, never the entries.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tables = SDNIndex.empty()  # Fills keys and postings only
+        self._entry_offsets = array('Q', [0])
+        self._spool = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self._spool.close()
+
+    def __len__(self) -> int:
+        return len(self._entry_offsets) - 1
+
+    def add(self, entry: Dict[str, Any]):
+        self._tables.index_entry(len(self), entry)
+        data = _entry_json(entry)
+        self._spool.write(data)
+        self._entry_offsets.append(self._entry_offsets[-1] + len(data))
+
+    def write(self, version: str):
+        """Write the snapshot of every entry added so far as list ``version``."""
+        self._tables.version = version
+        self._spool.seek(0)
+        _write_file(self.path, self._tables, len(self), self._entry_offsets,
+                    lambda snapshot_file: shutil.copyfileobj(self._spool, snapshot_file))
+
+
+def _write_file(path: str, index: SDNIndex, entry_count: int, entry_offsets: array, write_entry_blob):
+    """Write the sections of ``index`` (keys and postings) with the given entry blob.
+
+    Sections are produced and written in file order and the header is
+    filled in last, so at most one table's sections are held in memory.
+    """
+    ngrams = index.ngrams
+
+    def entry_key_start() -> bytes:
+        starts = array('I', [0] * (entry_count + 1))
+        for key_id, position in enumerate(ngrams.key_entry):
+            starts[position + 1] = key_id + 1
+        return starts.tobytes()
+
+    def key_table():
+        blob, offsets = _string_sections(ngrams.keys)
+        return blob, offsets.tobytes()
+
+    def length_table():
+        lengths = sorted(ngrams.keys_by_length)
+        offsets, key_ids = _grouped_sections(ngrams.keys_by_length, lengths)
+        return array('I', lengths).tobytes(), offsets.tobytes(), key_ids.tobytes()
+
+    def posting_table(groups):
+        keys = sorted(groups)
+        blob, offsets = _string_sections(keys)
+        posting_offsets, postings = _grouped_sections(groups, keys)
+        return blob, offsets.tobytes(), posting_offsets.tobytes(), postings.tobytes()
+
+    sections = {
+        "version": lambda: index.version.encode('utf-8'),
+        "entry_offsets": entry_offsets.tobytes,
+        "key_entry": lambda: array('I', ngrams.key_entry).tobytes(),
+        "key_kind": lambda: array('B', ngrams.key_kind).tobytes(),
+        "key_length": lambda: array('I', ngrams.key_length).tobytes(),
+        "entry_key_start": entry_key_start,
+    }
+    tables = (
+        (("key_blob", "key_offsets"), key_table),
+        (("length_values", "length_offsets", "length_key_ids"), length_table),
+        (("gram_blob", "gram_offsets", "posting_offsets", "postings"),
+         lambda: posting_table(ngrams.postings)),
+        (("phonetic_blob", "phonetic_offsets", "phonetic_posting_offsets", "phonetic_postings"),
+         lambda: posting_table(ngrams.phonetic_postings)),
+        (("identifier_blob", "identifier_offsets", "identifier_posting_offsets", "identifier_postings"),
+         lambda: posting_table(index.identifiers)),
+        (("attribute_blob", "attribute_offsets", "attribute_posting_offsets", "attribute_postings"),
+         lambda: posting_table(index.attributes)),
+    )
+    for names, build in tables:
+        sections.update(zip(names, _table_sections(build, len(names))))
+
+    bounds = []
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as snapshot_file:
+            snapshot_file.write(b"\0" * _HEADER.size)
+            for name in SECTIONS:
+                snapshot_file.write(b"\0" * (-snapshot_file.tell() % _ALIGNMENT))
+                start = snapshot_file.tell()
+                if name == "entry_blob":
+                    write_entry_blob(snapshot_file)
+                    if snapshot_file.tell() - start != entry_offsets[-1]:
+                        raise ValueError("SDN snapshot entry blob does not match its offsets")
+                else:
+                    snapshot_file.write(sections[name]())
+                bounds.extend((start, snapshot_file.tell() - start))
+            snapshot_file.seek(0)
+            snapshot_file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(SECTIONS), *bounds))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,151 @@
+"""Bulk ingestion of MT103 batch files (RJE / FIN downloads).
+
+A file holds many messages, either as ``{1:...}{2:...}{4:...-}`` blocks one
+after another or separated by ``$`` (RJE). Files are read in chunks and
+split message by message; at most one write batch of parsed messages is
+held in memory, never the whole file.
+
+    python -m app.services.swift_ingest batch.rje [more files...]
+"""
+import argparse
+import codecs
+import re
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.swift_service import extract_mt103_data, save_batch_to_database
+
+READ_CHUNK_SIZE = 64 * 1024
+# Messages written per transaction
+INGEST_BATCH_SIZE = 500
+# "$" ends an RJE message; a basic header block "{1:" starts a FIN message
+MESSAGE_BOUNDARY_PATTERN = re.compile(r"\$|\{1:")
+
+
+def iter_mt103_messages(stream, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+    """Yield the messages of a batch file one at a time.
+
+    ``stream`` is any object with ``read(size)``, text or binary; bytes are
+    decoded as UTF-8 (a BOM is dropped, invalid bytes are replaced).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        at_end = not chunk
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk, final=at_end)
+        pending += chunk
+
+        start = 0
+        for boundary in MESSAGE_BOUNDARY_PATTERN.finditer(pending):
+            if boundary.group() == "{1:" and boundary.start() == start:
+                continue  # the header of the message being collected
+            message = pending[start:boundary.start()].strip()
+            if message:
+                yield message
+            start = boundary.end() if boundary.group() == "$" else boundary.start()
+        # A "{1" cut off by the chunk edge is completed by the next read
+        pending = pending[start:]
+
+        if at_end:
+            message = pending.strip()
+            if message:
+                yield message
+            return
+
+
+def process_mt103_stream(stream, save: bool = True,
+                         batch_size: int = INGEST_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Parse (and save) every message of a batch file, yielding one result per message.
+
+    Parsed messages are saved ``batch_size`` at a time in one transaction and
+    their results are yielded, in file order, once their batch is written. A
+    message that fails does not stop the batch; its result carries the error.
+    """
+    pending: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]] = []
+    for position, message in enumerate(iter_mt103_messages(stream), start=1):
+        result = {"index": position, "transaction_reference": None}
+        parsed = None
+        try:
+            parsed = extract_mt103_data(message)
+            result["transaction_reference"] = parsed.get("transaction_reference")
+            if not parsed.get("transaction_reference"):
+                parsed = None
+                raise ValueError("Failed to extract required information")
+            result["status"] = "success"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+
+        if not save:
+            yield result
+            continue
+        pending.append((result, parsed))
+        if len(pending) >= batch_size:
+            yield from _write_batch(pending)
+            pending = []
+    if pending:
+        yield from _write_batch(pending)
+
+
+def _write_batch(pending: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    parsed_results = [(result, parsed) for result, parsed in pending if parsed is not None]
+    try:
+        inserted = save_batch_to_database([parsed for _, parsed in parsed_results])
+        for (result, _), is_new in zip(parsed_results, inserted):
+            result["duplicate"] = not is_new
+    except Exception as e:
+        for result, _ in parsed_results:
+            result["status"] = "error"
+            result["error"] = str(e)
+    return [result for result, _ in pending]
+
+
+def summarize_results(results: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    summary = {"total": 0, "succeeded": 0, "failed": 0, "duplicates": 0}
+    for result in results:
+        summary["total"] += 1
+        summary["succeeded" if result["status"] == "success" else "failed"] += 1
+        summary["duplicates"] += bool(result.get("duplicate"))
+    return summary
+
+
+def _print_results(path: str, results: Iterable[Dict[str, Any]], quiet: bool) -> Iterator[Dict[str, Any]]:
+    for result in results:
+        if result["status"] != "success":
+            print(f"{path} #{result['index']}: FAILED {result['transaction_reference'] or '-'}: {result['error']}")
+        elif not quiet:
+            duplicate = " (already stored)" if result.get("duplicate") else ""
+            print(f"{path} #{result['index']}: OK {result['transaction_reference']}{duplicate}")
+        yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest MT103 batch files into the SWIFT message store")
+    parser.add_argument("files", nargs="+", help="Batch files to ingest ('-' reads stdin)")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and report without saving")
+    parser.add_argument("--quiet", action="store_true", help="Only print failures and the summaries")
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.files:
+        stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+        started = time.perf_counter()
+        try:
+            results = process_mt103_stream(stream, save=not args.dry_run)
+            summary = summarize_results(_print_results(path, results, args.quiet))
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        failed += summary["failed"]
+        print(f"{path}: {summary['total']} messages, {summary['succeeded']} succeeded "
+              f"({summary['duplicates']} already stored), {summary['failed']} failed "
+              f"in {elapsed:.2f}s ({summary['total'] / elapsed if elapsed else 0:.0f} messages/s)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
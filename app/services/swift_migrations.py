@@ -0,0 +1,108 @@
+"""Explicit data migrations of the SWIFT message store.
+
+``dedupe-references`` resolves messages saved more than once under the same
+transaction_reference before the unique index on it existed. The first row
+of each reference is kept; later copies are moved, with the id of the row
+they duplicate, to ``swift_messages_duplicates`` and the unique index is
+created, all in one transaction. ``--dry-run`` only reports what would move.
+
+    python -m app.services.swift_migrations dedupe-references --dry-run
+    python -m app.services.swift_migrations dedupe-references
+"""
+import argparse
+import sqlite3
+from typing import Any, Dict
+
+from app.services.swift_service import TRANSACTION_REFERENCE_INDEX_SQL
+from app.utils import DATABASE_PATH
+
+DUPLICATES_TABLE = "swift_messages_duplicates"
+# Every row after the first of its transaction_reference, with the id of that first row
+DUPLICATE_ROWS_SQL = """
+    SELECT message.id AS original_id, kept.kept_id
+    FROM swift_messages AS message
+    JOIN (
+        SELECT transaction_reference, MIN(id) AS kept_id
+        FROM swift_messages
+        WHERE transaction_reference IS NOT NULL
+        GROUP BY transaction_reference
+        HAVING COUNT(*) > 1
+    ) AS kept ON message.transaction_reference = kept.transaction_reference
+    WHERE message.id != kept.kept_id
+"""
+SAMPLE_SIZE = 10
+
+
+def _message_columns(conn: sqlite3.Connection):
+    return [(row[1], row[2]) for row in conn.execute("PRAGMA table_info(swift_messages)") if row[1] != "id"]
+
+
+def dedupe_transaction_references(db_path: str = DATABASE_PATH, dry_run: bool = False) -> Dict[str, Any]:
+    """Move duplicate messages aside and create the unique transaction_reference index.
+
+    Returns the number of rows moved (or that would be), the references they
+    share, a sample of those references and whether the index now exists.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        # Hold the write lock so no duplicate is saved between the move and the index
+        conn.execute("BEGIN IMMEDIATE")
+        moved, references = conn.execute(
+            f"SELECT COUNT(*), COUNT(DISTINCT kept_id) FROM ({DUPLICATE_ROWS_SQL})"
+        ).fetchone()
+        sample = [row[0] for row in conn.execute(
+            "SELECT transaction_reference FROM swift_messages "
+            f"WHERE id IN (SELECT kept_id FROM ({DUPLICATE_ROWS_SQL})) ORDER BY id LIMIT ?",
+            (SAMPLE_SIZE,),
+        )]
+        result = {"duplicates": moved, "references": references, "sample": sample, "index_created": False}
+        if dry_run:
+            conn.execute("ROLLBACK")
+            return result
+
+        columns = _message_columns(conn)
+        column_names = ", ".join(name for name, _ in columns)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {DUPLICATES_TABLE} ("
+            "original_id INTEGER PRIMARY KEY, kept_id INTEGER NOT NULL, moved_at TEXT NOT NULL, "
+            + ", ".join(f"{name} {column_type}" for name, column_type in columns) + ")"
+        )
+        conn.execute(
+            f"INSERT INTO {DUPLICATES_TABLE} (original_id, kept_id, moved_at, {column_names}) "
+            f"SELECT duplicate.original_id, duplicate.kept_id, datetime('now'), "
+            f"{', '.join(f'message.{name}' for name, _ in columns)} "
+            f"FROM ({DUPLICATE_ROWS_SQL}) AS duplicate "
+            "JOIN swift_messages AS message ON message.id = duplicate.original_id"
+        )
+        conn.execute(f"DELETE FROM swift_messages WHERE id IN (SELECT original_id FROM {DUPLICATES_TABLE})")
+        conn.execute(TRANSACTION_REFERENCE_INDEX_SQL)
+        conn.execute("COMMIT")
+        result["index_created"] = True
+        return result
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run explicit data migrations of the SWIFT message store")
+    parser.add_argument("migration", choices=["dedupe-references"])
+    parser.add_argument("--db", default=DATABASE_PATH, help="SQLite database (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without changing it")
+    args = parser.parse_args()
+
+    result = dedupe_transaction_references(args.db, dry_run=args.dry_run)
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"{verb} {result['duplicates']} duplicate messages of {result['references']} transaction references "
+          f"to {DUPLICATES_TABLE}")
+    if result["sample"]:
+        print(f"References: {', '.join(result['sample'])}{', ...' if result['references'] > SAMPLE_SIZE else ''}")
+    if result["index_created"]:
+        print("Unique index on transaction_reference created")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Indexed lookups and keyset-paginated listing of stored SWIFT messages.
+
+Every lookup column has an index (see ``initialize_db``); the INN and
+account indexes also cover ``transaction_date``, so a counterparty's
+history comes back newest first straight from the index. Listing walks the
+table in ``id`` order from a cursor, so a page costs the same wherever it
+falls in the table.
+"""
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.swift_service import MESSAGE_COLUMNS, SQLITE_MAX_VARIABLES
+from app.utils import get_db_connection
+
+LOOKUP_COLUMNS = ("transaction_reference", "sender_inn", "receiver_inn", "sender_account", "receiver_account")
+# Match either side of the payment
+EITHER_SIDE_FIELDS = {
+    "inn": ("sender_inn", "receiver_inn"),
+    "account": ("sender_account", "receiver_account"),
+}
+LOOKUP_FIELDS = LOOKUP_COLUMNS + tuple(EITHER_SIDE_FIELDS)
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 10000
+MAX_SEARCH_VALUES = 100
+MAX_LOOKUP_KEYS = 5000
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+ORDER_BY = "ORDER BY transaction_date DESC, id DESC"
+STORED_COLUMNS = ("id",) + MESSAGE_COLUMNS + ("status",)
+LIST_PAGE_SIZE = 500
+LIST_MAX_PAGE_SIZE = 5000
+
+
+def _columns(field: str):
+    if field in EITHER_SIDE_FIELDS:
+        return EITHER_SIDE_FIELDS[field]
+    if field in LOOKUP_COLUMNS:
+        return (field,)
+    raise ValueError(f"Unknown lookup field: {field}. Use one of: {', '.join(LOOKUP_FIELDS)}")
+
+
+def _limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_LIMIT
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1 or limit > MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def _date_conditions(date_from: Optional[str], date_to: Optional[str]):
+    conditions, params = [], []
+    for value, operator in ((date_from, ">="), (date_to, "<=")):
+        if value:
+            if not DATE_PATTERN.match(value):
+                raise ValueError(f"Dates must be YYYY-MM-DD, got: {value}")
+            conditions.append(f"transaction_date {operator} ?")
+            params.append(value)
+    return conditions, params
+
+
+def _key_condition(columns, keys: List[str]):
+    placeholders = ", ".join("?" * len(keys))
+    condition = " OR ".join(f"{column} IN ({placeholders})" for column in columns)
+    return f"({condition})", list(keys) * len(columns)
+
+
+def _clean_keys(keys: Iterable[Any]) -> List[str]:
+    # Stripped, without blanks and repeats, in the order given
+    stripped = (str(key).strip() for key in keys if key is not None)
+    return list(dict.fromkeys(key for key in stripped if key))
+
+
+def search_messages(criteria: Dict[str, Iterable[Any]], date_from: Optional[str] = None,
+                    date_to: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Stored messages matching every field in ``criteria`` (any of its values), newest first."""
+    conditions, params = _date_conditions(date_from, date_to)
+    total_values = 0
+    for field, values in criteria.items():
+        keys = _clean_keys(values)
+        if not keys:
+            continue
+        total_values += len(keys)
+        condition, key_params = _key_condition(_columns(field), keys)
+        conditions.append(condition)
+        params.extend(key_params)
+    if total_values == 0:
+        raise ValueError(f"Give at least one of: {', '.join(LOOKUP_FIELDS)}")
+    if total_values > MAX_SEARCH_VALUES:
+        raise ValueError(f"At most {MAX_SEARCH_VALUES} values per search; use a batch lookup for more")
+
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT * FROM swift_messages WHERE {' AND '.join(conditions)} {ORDER_BY} LIMIT ?",
+            params + [_limit(limit)],
+        )
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def lookup_messages(field: str, keys: Iterable[Any], date_from: Optional[str] = None,
+                    date_to: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Batch lookup: the stored messages for each key, grouped by key, newest first.
+
+    Keys are queried in chunks that fit SQLite's bound parameter limit; at
+    most ``limit`` messages are returned in total and ``truncated`` tells
+    whether more were available (``not_found`` is then unknown, None).
+    """
+    columns = _columns(field)
+    keys = _clean_keys(keys)
+    if not keys:
+        raise ValueError("keys must be a non-empty list")
+    if len(keys) > MAX_LOOKUP_KEYS:
+        raise ValueError(f"At most {MAX_LOOKUP_KEYS} keys per lookup")
+    limit = _limit(limit)
+    date_conditions, date_params = _date_conditions(date_from, date_to)
+    chunk_size = (SQLITE_MAX_VARIABLES - len(date_params) - 1) // len(columns)
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    returned = 0
+    truncated = False
+    conn = get_db_connection()
+    try:
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            chunk_keys = set(chunk)
+            condition, params = _key_condition(columns, chunk)
+            rows = conn.execute(
+                f"SELECT * FROM swift_messages WHERE {' AND '.join([condition] + date_conditions)} "
+                f"{ORDER_BY} LIMIT ?",
+                params + date_params + [limit - returned + 1],
+            ).fetchall()
+            if len(rows) > limit - returned:
+                rows = rows[:limit - returned]
+                truncated = True
+            for row in rows:
+                message = dict(row)
+                # A message can belong to two keys (sender and receiver)
+                for key in {message[column] for column in columns} & chunk_keys:
+                    results.setdefault(key, []).append(message)
+            returned += len(rows)
+            if truncated:
+                break
+    finally:
+        conn.close()
+
+    return {
+        "field": field,
+        "results": results,
+        "not_found": None if truncated else [key for key in keys if key not in results],
+        "returned": returned,
+        "truncated": truncated,
+    }
+
+
+def list_messages_query(fields: Optional[List[str]] = None, cursor: Any = None,
+                        date_from: Optional[str] = None, date_to: Optional[str] = None,
+                        statuses: Optional[Iterable[Any]] = None,
+                        limit: Optional[int] = None) -> Tuple[str, List[Any]]:
+    """Build the listing query: messages after ``cursor`` (an id) in id order.
+
+    ``fields`` projects the columns (``id`` is always included, it is the
+    cursor), ``date_from`` / ``date_to`` bound ``transaction_date`` and
+    ``statuses`` keeps messages with any of those statuses. Arguments are
+    validated here, before any row is streamed.
+    """
+    columns = list(STORED_COLUMNS)
+    if fields:
+        unknown = [field for field in fields if field not in STORED_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        columns = ["id"] + [field for field in dict.fromkeys(fields) if field != "id"]
+
+    conditions, params = _date_conditions(date_from, date_to)
+    if cursor not in (None, ""):
+        if not str(cursor).isdigit():
+            raise ValueError("Invalid cursor")
+        conditions.insert(0, "id > ?")
+        params.insert(0, int(cursor))
+    statuses = _clean_keys(statuses or [])
+    if statuses:
+        conditions.append(f"status IN ({', '.join('?' * len(statuses))})")
+        params.extend(statuses)
+
+    sql = f"SELECT {', '.join(columns)} FROM swift_messages"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+
+def iter_query_rows(sql: str, params: List[Any]) -> Iterator[Dict[str, Any]]:
+    """Yield rows as dicts straight from the cursor; the connection closes when done."""
+    conn = get_db_connection()
+    try:
+        for row in conn.execute(sql, params):
+            yield dict(row)
+    finally:
+        conn.close()
+
+
+def list_messages_page(cursor: Any = None, limit: int = LIST_PAGE_SIZE, **query) -> Dict[str, Any]:
+    """One page of stored messages; pass ``next_cursor`` back as ``cursor`` for the next one."""
+    if not 0 < limit <= LIST_MAX_PAGE_SIZE:
+        raise ValueError(f"'limit' must be between 1 and {LIST_MAX_PAGE_SIZE}")
+    # One extra row tells whether another page follows
+    results = list(iter_query_rows(*list_messages_query(cursor=cursor, limit=limit + 1, **query)))
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = results[-1]["id"]
+    return {"count": len(results), "next_cursor": next_cursor, "results": results}
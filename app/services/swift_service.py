@@ -20,6 +20,39 @@ import logging
 RATE_LIMIT_DELAY = 1  # Delay between requests in seconds
 
 
+TRANSACTION_REFERENCE_INDEX_SQL = """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_swift_messages_transaction_reference
+    ON swift_messages (transaction_reference)
+"""
+# Counterparty lookups filter on one of these and read the history by date
+LOOKUP_INDEX_COLUMNS = ("sender_inn", "receiver_inn", "sender_account", "receiver_account")
+LOOKUP_INDEXES_SQL = [
+    f"CREATE INDEX IF NOT EXISTS idx_swift_messages_{column}_date "
+    f"ON swift_messages ({column}, transaction_date)"
+    for column in LOOKUP_INDEX_COLUMNS
+] + [
+    "CREATE INDEX IF NOT EXISTS idx_swift_messages_transaction_date "
+    "ON swift_messages (transaction_date)"
+]
+MESSAGE_COLUMNS = (
+    "transaction_reference", "transaction_type", "transaction_date", "transaction_currency",
+    "transaction_amount", "sender_account", "sender_inn", "sender_name", "sender_address",
+    "sender_bank_code", "receiver_account", "receiver_inn", "receiver_name", "receiver_kpp",
+    "receiver_bank_code", "receiver_bank_name", "transaction_purpose", "transaction_fees",
+    "company_info", "receiver_info",
+)
+# A message whose transaction_reference is already stored is skipped, not updated.
+# No conflict target: the unique index is missing until duplicates saved
+# before it existed are migrated (see swift_migrations)
+INSERT_MESSAGE_SQL = f"""
+    INSERT INTO swift_messages ({", ".join(MESSAGE_COLUMNS)})
+    VALUES ({", ".join("?" * len(MESSAGE_COLUMNS))})
+    ON CONFLICT DO NOTHING
+"""
+# Bound parameters per statement on older SQLite builds
+SQLITE_MAX_VARIABLES = 999
+
+
 # Initialize Database
 def initialize_db():
     conn = sqlite3.connect(DATABASE_PATH)
@@ -47,26 +80,84 @@ def initialize_db():
         transaction_purpose TEXT,
         transaction_fees TEXT,
         company_info TEXT,
-        receiver_info TEXT
+        receiver_info TEXT,
+        status TEXT
     )
     """
     )
+    # Tables created before the status column existed
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(swift_messages)")]
+    if "status" not in columns:
+        cursor.execute("ALTER TABLE swift_messages ADD COLUMN status TEXT")
+    try:
+        cursor.execute(TRANSACTION_REFERENCE_INDEX_SQL)
+    except sqlite3.IntegrityError:
+        # Duplicates saved before the index existed are never removed at
+        # startup; the explicit migration moves them aside and creates the index
+        logging.warning(
+            "swift_messages holds duplicate transaction_reference values, so the unique index was not created; "
+            "run `python -m app.services.swift_migrations dedupe-references` to resolve them"
+        )
+    for index_sql in LOOKUP_INDEXES_SQL:
+        cursor.execute(index_sql)
     conn.commit()
     conn.close()
 
 
-def extract_transaction_reference(message):
-    match = re.search(r":20:([^\n]+)", message)
+# Tags read by extract_mt103_data. Only the leading colon of a tag is consumed,
+# so a tag written right after another one (":20::23B:") is still found.
+PARSED_FIELD_TAGS = ("20", "23B", "32A", "50K", "59")
+FIELD_TAG_PATTERN = re.compile(r":(" + "|".join(PARSED_FIELD_TAGS) + r")(?=:)")
+
+TRANSACTION_REFERENCE_PATTERN = re.compile(r":20:([^\n]+)")
+TRANSACTION_TYPE_PATTERN = re.compile(r":23B:([^\n]+)")
+VALUE_DATE_AMOUNT_PATTERN = re.compile(r":32A:(\d{6})([A-Z]{3})([\d,]+)")
+SENDER_PATTERNS = [
+    re.compile(r":50K:\s*/(\d+)\s*\n(?:INN(\d+)\s*\n)?([^\n]+)(?:\n([\s\S]+?)(?=:\d{2}[A-Z]:))?"),
+    re.compile(r":50K:\s*/(\d+)\s*\n([^\n]+)(?:\n([\s\S]+?)(?=:\d{2}[A-Z]:))?"),
+    re.compile(r":50K:(?:\s*/)?(\d+)\s*\n([^\n]+)(?:\n([\s\S]+?)(?=:\d{2}[A-Z]:))?"),
+]
+RECEIVER_ACCOUNT_PATTERN = re.compile(r":59:\s*/(\d+)")
+RECEIVER_DETAILS_PATTERN = re.compile(
+    r":59:\s*/\d+\s*\n(?:INN(\d+)(?:\.KPP(\d+))?\s*\n)?([^\n]+)"
+)
+
+
+def tokenize_mt103(message):
+    """Scan the message once and return ``{tag: offset}`` of the first
+    occurrence of each of the PARSED_FIELD_TAGS present in it."""
+    fields = {}
+    for match in FIELD_TAG_PATTERN.finditer(message):
+        fields.setdefault(match.group(1), match.start())
+    return fields
+
+
+def _search_field(pattern, message, fields, tag):
+    """Same result as ``pattern.search(message)``, starting at the tokenized tag.
+
+    Every field pattern begins with its literal tag, so nothing can match
+    before the tag's first occurrence, and a missing tag cannot match at all.
+    """
+    if fields is None:
+        return pattern.search(message)
+    start = fields.get(tag)
+    if start is None:
+        return None
+    return pattern.match(message, start) or pattern.search(message, start + 1)
+
+
+def extract_transaction_reference(message, fields=None):
+    match = _search_field(TRANSACTION_REFERENCE_PATTERN, message, fields, "20")
     return match.group(1).strip() if match else None
 
 
-def extract_transaction_type(message):
-    match = re.search(r":23B:([^\n]+)", message)
+def extract_transaction_type(message, fields=None):
+    match = _search_field(TRANSACTION_TYPE_PATTERN, message, fields, "23B")
     return match.group(1).strip() if match else None
 
 
-def extract_transaction_date_and_currency(message):
-    match = re.search(r":32A:(\d{6})([A-Z]{3})([\d,]+)", message)
+def extract_transaction_date_and_currency(message, fields=None):
+    match = _search_field(VALUE_DATE_AMOUNT_PATTERN, message, fields, "32A")
     if match:
         raw_date, currency, amount = match.groups()
         try:
@@ -78,15 +169,9 @@ def extract_transaction_date_and_currency(message):
     return None, None, None
 
 
-def extract_sender_details(message):
-    patterns = [
-        r":50K:\s*/(\d+)\s*\n(?:INN(\d+)\s*\n)?([^\n]+)(?:\n([\s\S]+?)(?=:\d{2}[A-Z]:))?",
-        r":50K:\s*/(\d+)\s*\n([^\n]+)(?:\n([\s\S]+?)(?=:\d{2}[A-Z]:))?",
-        r":50K:(?:\s*/)?(\d+)\s*\n([^\n]+)(?:\n([\s\S]+?)(?=:\d{2}[A-Z]:))?",
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, message)
+def extract_sender_details(message, fields=None):
+    for pattern in SENDER_PATTERNS:
+        match = _search_field(pattern, message, fields, "50K")
         if match:
             groups = match.groups()
             account = groups[0].strip() if groups[0] else None
@@ -114,13 +199,11 @@ def extract_sender_details(message):
     return None, None, None, None
 
 
-def extract_receiver_details(message):
-    account_pattern = r":59:\s*/(\d+)"
-    account_match = re.search(account_pattern, message)
+def extract_receiver_details(message, fields=None):
+    account_match = _search_field(RECEIVER_ACCOUNT_PATTERN, message, fields, "59")
     account = account_match.group(1).strip() if account_match else None
 
-    details_pattern = r":59:\s*/\d+\s*\n(?:INN(\d+)(?:\.KPP(\d+))?\s*\n)?([^\n]+)"
-    details_match = re.search(details_pattern, message)
+    details_match = _search_field(RECEIVER_DETAILS_PATTERN, message, fields, "59")
 
     if details_match:
         inn = details_match.group(1).strip() if details_match.group(1) else None
@@ -131,82 +214,96 @@ def extract_receiver_details(message):
     return account, None, None, None
 
 
+def _message_row(parsed_data):
+    return tuple(
+        # Ensure JSON serialization of company_info and receiver_info
+        json.dumps(parsed_data.get(column, {})) if column in ("company_info", "receiver_info")
+        else parsed_data.get(column)
+        for column in MESSAGE_COLUMNS
+    )
+
+
 def save_to_database(parsed_data):
-    """Save parsed SWIFT data to the database."""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
+    """Save parsed SWIFT data to the database.
 
-            # Check if a record with the same transaction_reference already exists
-            cursor.execute(
-                "SELECT 1 FROM swift_messages WHERE transaction_reference = ?",
-                (parsed_data.get("transaction_reference"),),
-            )
-            if cursor.fetchone() is not None:
-                print(
-                    f"Transaction with reference {parsed_data.get('transaction_reference')} already exists in the database."
-                )
-                return  # Exit the function without saving duplicate
-
-            # Proceed with insertion if no duplicate is found
-            cursor.execute(
-                """
-                INSERT INTO swift_messages (
-                    transaction_reference, transaction_type, transaction_date, transaction_currency,
-                    transaction_amount, sender_account, sender_inn, sender_name, sender_address,
-                    sender_bank_code, receiver_account, receiver_inn, receiver_name, receiver_kpp,
-                    receiver_bank_code, receiver_bank_name, transaction_purpose, transaction_fees,
-                    company_info, receiver_info
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    parsed_data.get("transaction_reference"),
-                    parsed_data.get("transaction_type"),
-                    parsed_data.get("transaction_date"),
-                    parsed_data.get("transaction_currency"),
-                    parsed_data.get("transaction_amount"),
-                    parsed_data.get("sender_account"),
-                    parsed_data.get("sender_inn"),
-                    parsed_data.get("sender_name"),
-                    parsed_data.get("sender_address"),
-                    parsed_data.get("sender_bank_code"),
-                    parsed_data.get("receiver_account"),
-                    parsed_data.get("receiver_inn"),
-                    parsed_data.get("receiver_name"),
-                    parsed_data.get("receiver_kpp"),
-                    parsed_data.get("receiver_bank_code"),
-                    parsed_data.get("receiver_bank_name"),
-                    parsed_data.get("transaction_purpose"),
-                    parsed_data.get("transaction_fees"),
-                    json.dumps(
-                        parsed_data.get("company_info", {})
-                    ),  # Ensure JSON serialization of company_info
-                    json.dumps(
-                        parsed_data.get("receiver_info", {})
-                    ),  # Ensure JSON serialization of receiver_info
-                ),
+    Returns False when a message with the same transaction_reference already
+    exists. The duplicate check is the batch writer's, so it also holds before
+    the unique index exists.
+    """
+    if not save_batch_to_database([parsed_data])[0]:
+        print(
+            f"Transaction with reference {parsed_data.get('transaction_reference')} already exists in the database."
+        )
+        return False
+    logging.info(f"Transaction {parsed_data.get('transaction_reference')} saved")
+    return True
+
+
+def save_batch_to_database(records):
+    """Save many parsed messages with one executemany in a single transaction.
+
+    Returns one flag per record: True if it was inserted, False if its
+    transaction_reference was already stored or came earlier in the batch.
+    Nothing is saved if the batch fails.
+    """
+    if not records:
+        return []
+    conn = get_db_connection()
+    try:
+        # Take the write lock up front so the duplicate check below stays true
+        # until the batch is committed
+        conn.execute("BEGIN IMMEDIATE")
+        references = list({record.get("transaction_reference") for record in records} - {None})
+        stored = set()
+        for start in range(0, len(references), SQLITE_MAX_VARIABLES):
+            chunk = references[start:start + SQLITE_MAX_VARIABLES]
+            cursor = conn.execute(
+                "SELECT transaction_reference FROM swift_messages "
+                f"WHERE transaction_reference IN ({', '.join('?' * len(chunk))})",
+                chunk,
             )
-            conn.commit()
-            logging.info(f"Transaction {parsed_data.get('transaction_reference')} saved")
+            stored.update(row[0] for row in cursor)
+
+        inserted = []
+        rows = []
+        for record in records:
+            reference = record.get("transaction_reference")
+            is_new = reference is None or reference not in stored
+            if is_new:
+                stored.add(reference)
+                rows.append(_message_row(record))
+            inserted.append(is_new)
+
+        conn.executemany(INSERT_MESSAGE_SQL, rows)
+        conn.commit()
+        logging.info(f"Saved {len(rows)} of {len(records)} transactions in one batch")
+        return inserted
     except sqlite3.Error as e:
+        conn.rollback()
         logging.error(f"Database error: {e}")
         raise
+    finally:
+        conn.close()
 
 
 def extract_mt103_data(message):
     message = message.replace("\r", "\n").replace("\n\n", "\n")
 
-    transaction_date, currency, amount = extract_transaction_date_and_currency(message)
+    fields = tokenize_mt103(message)
+
+    transaction_date, currency, amount = extract_transaction_date_and_currency(
+        message, fields
+    )
     sender_account, sender_inn, sender_name, sender_address = extract_sender_details(
-        message
+        message, fields
     )
     receiver_account, receiver_name, receiver_inn, receiver_kpp = (
-        extract_receiver_details(message)
+        extract_receiver_details(message, fields)
     )
 
     return {
-        "transaction_reference": extract_transaction_reference(message),
-        "transaction_type": extract_transaction_type(message),
+        "transaction_reference": extract_transaction_reference(message, fields),
+        "transaction_type": extract_transaction_type(message, fields),
         "transaction_date": transaction_date,
         "transaction_currency": currency,
         "transaction_amount": amount,
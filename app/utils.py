@@ -1,10 +1,19 @@
+import os
 import re
 import time
+from contextlib import contextmanager
 from transliterate import translit
 import sqlite3
 from marshmallow import Schema, fields
 
 
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+    import msvcrt
+
+
 DATABASE_PATH = "./data/swift_messages.db"
 
 
@@ -180,11 +189,45 @@ def get_db_connection():
     return conn
 
 
+@contextmanager
+def file_lock(path, blocking=True):
+    """Hold an exclusive, host-wide lock on ``path``.
+
+    Yields True when the lock is held and False when ``blocking`` is False
+    and another process already holds it.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    acquired = False
+    try:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            acquired = True
+        except OSError:
+            if blocking:
+                raise
+        yield acquired
+    finally:
+        if acquired:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+
+CYRILLIC_PATTERN = re.compile("[\u0400-\u04fe]")
+
+
 def transliterate_text(text):
     if text is None:
         return None
     try:
-        if any(ord(char) in range(0x0400, 0x04FF) for char in text):
+        if CYRILLIC_PATTERN.search(text):
             return translit(text, "ru", reversed=True)
         return text
 
@@ -193,22 +236,38 @@ def transliterate_text(text):
         return text
 
 
+# Compiled once at import instead of on every clean_company_name call
+ENTITY_ABBREVIATION_PATTERNS = [
+    (re.compile(re.escape(full_name), re.IGNORECASE), abbreviation)
+    for full_name, abbreviation in ENTITY_ABBREVIATIONS.items()
+]
+# Matches wherever any of the patterns above would; most names contain none
+ANY_ENTITY_ABBREVIATION_PATTERN = re.compile(
+    "|".join(re.escape(full_name) for full_name in ENTITY_ABBREVIATIONS), re.IGNORECASE
+)
+ENTITY_LABELS_PATTERN = re.compile(
+    r"\b(?:" + "|".join(ENTITY_LABELS) + r")\b", re.IGNORECASE
+)
+QUOTES_AND_SLASHES_PATTERN = re.compile(r"[\"\'/]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
 def clean_company_name(name):
     if not name:
         return None
 
     # Replace full names with abbreviations
 
-    for full_name, abbreviation in ENTITY_ABBREVIATIONS.items():
-        name = re.sub(re.escape(full_name), abbreviation, name, flags=re.IGNORECASE)
+    if ANY_ENTITY_ABBREVIATION_PATTERN.search(name):
+        for pattern, abbreviation in ENTITY_ABBREVIATION_PATTERNS:
+            name = pattern.sub(abbreviation, name)
 
     # Remove additional labels (if needed)
-    pattern = r"\b(?:" + "|".join(ENTITY_LABELS) + r")\b"
-    name = re.sub(pattern, "", name, flags=re.IGNORECASE).strip()
+    name = ENTITY_LABELS_PATTERN.sub("", name).strip()
 
     # Clean up unnecessary characters
-    name = re.sub(r"[\"\'/]", "", name)
-    name = re.sub(r"\s+", " ", name)
+    name = QUOTES_AND_SLASHES_PATTERN.sub("", name)
+    name = WHITESPACE_PATTERN.sub(" ", name)
     return name
 
 
@@ -0,0 +1,119 @@
+"""Synthetic OFAC SDN.XML generator for the screening benchmarks.
+
+Names are built from Russian / Central Asian / Arabic style syllables so the
+list has realistic token overlap and transliteration variety at any scale.
+
+    python -m benchmarks.generate_sdn_xml --entries 100000 --output /tmp/sdn.xml
+"""
+import argparse
+import random
+from xml.sax.saxutils import escape
+
+FIRST_NAMES = [
+    "Ivan", "Sergei", "Aleksandr", "Dmitriy", "Yuriy", "Olga", "Anna", "Natalya", "Rustam", "Timur",
+    "Aziz", "Farrukh", "Mukhammad", "Abdulla", "Shukhrat", "Zhanna", "Ali", "Hassan", "Yusuf", "Khalid",
+]
+SURNAME_ROOTS = [
+    "Petr", "Ivan", "Smirn", "Karim", "Usman", "Rakhim", "Sokol", "Pop", "Abdull", "Yusup",
+    "Khodj", "Tursun", "Nazar", "Kuznets", "Zhukov", "Mirza", "Salikh", "Rashid", "Akhmed", "Ergash",
+]
+SURNAME_SYLLABLES = ["", "", "a", "o", "ul", "ar", "in", "em", "ov", "ur", "al", "ib"]
+SURNAME_ENDINGS = ["ov", "ev", "aev", "oev", "in", "ova", "eva", "skiy", "enko", "i"]
+ORG_WORDS = [
+    "Bank", "Trading", "Petroleum", "Shipping", "Logistics", "Holding", "Invest", "Energy", "Metals",
+    "Group", "Industrial", "Capital", "Marine", "Export", "Technologies", "Resources", "Finance",
+]
+ORG_SUFFIXES = ["LLC", "OOO", "JSC", "LTD", "FZE", "AO", ""]
+LOCATIONS = [
+    ("Moscow", "Russia"), ("Saint Petersburg", "Russia"), ("Tashkent", "Uzbekistan"), ("Samarkand", "Uzbekistan"),
+    ("Tehran", "Iran"), ("Dubai", "United Arab Emirates"), ("Pyongyang", "Korea, North"), ("Minsk", "Belarus"),
+    ("Almaty", "Kazakhstan"), ("Damascus", "Syria"),
+]
+PROGRAMS = ["RUSSIA-EO14024", "UKRAINE-EO13662", "IRAN", "SDGT", "DPRK3", "CYBER2", "BELARUS-EO14038", "SYRIA"]
+ID_TYPES = ["Tax ID No.", "SWIFT/BIC", "BIK (RU)", "Passport", "Registration ID"]
+NAMESPACE = "https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/XML"
+
+
+def random_surname(rng: random.Random) -> str:
+    return rng.choice(SURNAME_ROOTS) + rng.choice(SURNAME_SYLLABLES) + rng.choice(SURNAME_ENDINGS)
+
+
+def random_id_number(rng: random.Random, id_type: str) -> str:
+    if id_type == "SWIFT/BIC":
+        letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        return "".join(rng.choice(letters) for _ in range(4)) + rng.choice(["RU", "UZ", "IR", "AE"]) + \
+            "".join(rng.choice(letters) for _ in range(2)) + rng.choice(["", "XXX"])
+    if id_type == "BIK (RU)":
+        return "04" + str(rng.randint(10 ** 6, 10 ** 7 - 1))
+    if id_type == "Tax ID No.":
+        return str(rng.randint(10 ** 9, 10 ** 12 - 1))
+    return str(rng.randint(10 ** 7, 10 ** 9))
+
+
+def generate_entry(rng: random.Random, uid: int) -> str:
+    parts = ["<sdnEntry>", f"<uid>{uid}</uid>"]
+    if rng.random() < 0.55:
+        parts.append(f"<firstName>{rng.choice(FIRST_NAMES)}</firstName>")
+        parts.append(f"<lastName>{random_surname(rng)}</lastName>")
+        parts.append("<sdnType>Individual</sdnType>")
+        aka_names = [f"{random_surname(rng)} {rng.choice(FIRST_NAMES)}" for _ in range(rng.choice([0, 0, 1, 2]))]
+    else:
+        words = " ".join(rng.sample(ORG_WORDS, rng.randint(1, 2)))
+        name = f"{random_surname(rng).upper()} {words.upper()} {rng.choice(ORG_SUFFIXES)}".strip()
+        parts.append(f"<lastName>{escape(name)}</lastName>")
+        parts.append("<sdnType>Entity</sdnType>")
+        aka_names = [f"{random_surname(rng).upper()} {rng.choice(ORG_WORDS).upper()}"
+                     for _ in range(rng.choice([0, 1, 1, 2, 3]))]
+
+    parts.append("<programList>" + "".join(
+        f"<program>{program}</program>" for program in rng.sample(PROGRAMS, rng.randint(1, 2))
+    ) + "</programList>")
+
+    if rng.random() < 0.6:
+        parts.append("<idList>")
+        for i in range(rng.randint(1, 3)):
+            id_type = rng.choice(ID_TYPES)
+            parts.append(f"<id><uid>{uid * 10 + i}</uid><idType>{id_type}</idType>"
+                         f"<idNumber>{random_id_number(rng, id_type)}</idNumber></id>")
+        parts.append("</idList>")
+
+    if aka_names:
+        parts.append("<akaList>" + "".join(
+            f"<aka><uid>{uid * 10 + i}</uid><type>a.k.a.</type><category>strong</category>"
+            f"<lastName>{escape(aka)}</lastName></aka>"
+            for i, aka in enumerate(aka_names)
+        ) + "</akaList>")
+
+    if rng.random() < 0.7:
+        city, country = rng.choice(LOCATIONS)
+        parts.append(f"<addressList><address><uid>{uid * 10}</uid><city>{city}</city>"
+                     f"<country>{escape(country)}</country></address></addressList>")
+
+    parts.append("</sdnEntry>")
+    return "".join(parts)
+
+
+def generate_sdn_xml(path: str, entries: int, seed: int = 1):
+    """Write a synthetic SDN list with ``entries`` entries to ``path``, one entry at a time."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as xml_file:
+        xml_file.write('<?xml version="1.0" standalone="yes"?>\n')
+        xml_file.write(f'<sdnList xmlns="{NAMESPACE}">\n')
+        xml_file.write(f"<publshInformation><Record_Count>{entries}</Record_Count></publshInformation>\n")
+        for i in range(entries):
+            xml_file.write(generate_entry(rng, 10000 + i) + "\n")
+        xml_file.write("</sdnList>\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    generate_sdn_xml(args.output, args.entries, args.seed)
+    print(f"Wrote {args.entries} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
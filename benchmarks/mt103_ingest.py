@@ -0,0 +1,149 @@
+"""MT103 ingest rate: per-message writes against batched, transactional writes.
+
+Generates a batch file of synthetic MT103 messages (a share of them
+repeating an earlier transaction reference), parses it once and times
+writing the parsed messages into a fresh SQLite database:
+
+- ``legacy``: SELECT on transaction_reference, INSERT and commit per
+  message on a table without the reference index (the previous writer),
+- ``single``: ``save_to_database`` per message (INSERT ... ON CONFLICT, one
+  commit each),
+- ``batch``: ``save_batch_to_database`` with executemany, ``--batch-size``
+  messages per transaction,
+
+and then the whole bulk pipeline (read, split, parse, batch write) end to end.
+
+    python -m benchmarks.mt103_ingest --messages 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMPANY_NAMES = [
+    "OOO \"ROMASHKA {n}\"", "AO TASHKENT METALL {n}", "Limited Liability Company Alfa Trade {n}",
+    "MChJ SAMARQAND TEKSTIL {n}", "IP Ivanov Ivan {n}", "ООО ВЕКТОР {n}",
+]
+CITIES = ["TASHKENT UZ", "MOSCOW RU", "г. Москва, ул. Тверская 1", "SAMARKAND UZ"]
+
+
+def generate_mt103(rng: random.Random, reference: str) -> str:
+    return (
+        "{1:F01BANKUZ22AXXX0000000000}{2:I103BANKRUMMXXXXN}{4:\r\n"
+        f":20:{reference}\r\n:23B:CRED\r\n"
+        f":32A:{rng.choice(['24', '25'])}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+        f"{rng.choice(['USD', 'RUB', 'EUR'])}{rng.randint(1, 999999)},{rng.randint(0, 99):02d}\r\n"
+        f":50K:/{rng.randint(10 ** 19, 10 ** 20 - 1)}\r\nINN{rng.randint(10 ** 8, 10 ** 9 - 1)}\r\n"
+        f"{rng.choice(COMPANY_NAMES).format(n=rng.randint(1, 5000))}\r\n{rng.choice(CITIES)}\r\n"
+        f":59:/{rng.randint(10 ** 19, 10 ** 20 - 1)}\r\n"
+        f"INN{rng.randint(10 ** 9, 10 ** 10 - 1)}.KPP{rng.randint(10 ** 8, 10 ** 9 - 1)}\r\n"
+        f"{rng.choice(COMPANY_NAMES).format(n=rng.randint(1, 5000))}\r\n{rng.choice(CITIES)}\r\n"
+        f":70:PAYMENT FOR GOODS\r\n:71A:OUR\r\n-}}"
+    )
+
+
+def generate_batch_file(path: str, messages: int, duplicate_share: float, seed: int = 1):
+    """Write ``messages`` MT103 messages as a "$"-separated RJE file."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as batch_file:
+        for i in range(messages):
+            if i and rng.random() < duplicate_share:
+                reference = f"REF{rng.randrange(i):010d}"
+            else:
+                reference = f"REF{i:010d}"
+            batch_file.write(generate_mt103(rng, reference) + "$")
+
+
+def use_database(path: str, reference_index: bool = True):
+    """Point the SWIFT service at a fresh database file."""
+    from app import utils
+    from app.services import swift_service
+
+    utils.DATABASE_PATH = swift_service.DATABASE_PATH = path
+    swift_service.initialize_db()
+    if not reference_index:
+        with utils.get_db_connection() as conn:
+            conn.execute("DROP INDEX idx_swift_messages_transaction_reference")
+
+
+def legacy_save(conn, parsed):
+    from app.services.swift_service import MESSAGE_COLUMNS, _message_row
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM swift_messages WHERE transaction_reference = ?",
+                   (parsed.get("transaction_reference"),))
+    if cursor.fetchone() is not None:
+        return
+    cursor.execute(f"INSERT INTO swift_messages ({', '.join(MESSAGE_COLUMNS)}) "
+                   f"VALUES ({', '.join('?' * len(MESSAGE_COLUMNS))})", _message_row(parsed))
+    conn.commit()
+
+
+def run_benchmark(workdir: str, messages: int, batch_size: int, duplicate_share: float, seed: int):
+    from app.services.swift_ingest import iter_mt103_messages, process_mt103_stream, summarize_results
+    from app.services.swift_service import extract_mt103_data, save_batch_to_database, save_to_database
+    from app.utils import get_db_connection
+
+    batch_path = os.path.join(workdir, "batch.rje")
+    generate_batch_file(batch_path, messages, duplicate_share, seed)
+    with open(batch_path, 'rb') as batch_file:
+        started = time.perf_counter()
+        parsed_messages = [extract_mt103_data(message) for message in iter_mt103_messages(batch_file)]
+        parse_seconds = time.perf_counter() - started
+    unique = len({parsed["transaction_reference"] for parsed in parsed_messages})
+    print(f"{len(parsed_messages)} messages, {unique} unique references; "
+          f"parsed at {len(parsed_messages) / parse_seconds:.0f} messages/s")
+
+    rates = {}
+    for mode in ("legacy", "single", "batch"):
+        use_database(os.path.join(workdir, f"{mode}.db"), reference_index=mode != "legacy")
+        started = time.perf_counter()
+        if mode == "legacy":
+            conn = get_db_connection()
+            for parsed in parsed_messages:
+                legacy_save(conn, parsed)
+            conn.close()
+        elif mode == "single":
+            for parsed in parsed_messages:
+                save_to_database(parsed)
+        else:
+            for start in range(0, len(parsed_messages), batch_size):
+                save_batch_to_database(parsed_messages[start:start + batch_size])
+        seconds = time.perf_counter() - started
+        with get_db_connection() as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM swift_messages").fetchone()[0]
+        rates[mode] = len(parsed_messages) / seconds
+        print(f"{mode:<8} write {rates[mode]:>10.0f} messages/s  ({seconds:.2f}s, {stored} rows stored)")
+
+    use_database(os.path.join(workdir, "pipeline.db"))
+    with open(batch_path, 'rb') as batch_file:
+        started = time.perf_counter()
+        summary = summarize_results(process_mt103_stream(batch_file, batch_size=batch_size))
+        seconds = time.perf_counter() - started
+    print(f"pipeline {summary['total'] / seconds:>10.0f} messages/s end to end  ({summary})")
+    print(f"batch writes are {rates['batch'] / rates['single']:.1f}x per-message upserts "
+          f"and {rates['batch'] / rates['legacy']:.1f}x the legacy writer")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MT103 ingest rate")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Share of repeated references")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="mt103-ingest-") as workdir:
+        # The service creates ./data/swift_messages.db when imported; keep that
+        # out of the working tree
+        os.makedirs(os.path.join(workdir, "data"))
+        os.chdir(workdir)
+        run_benchmark(workdir, args.messages, args.batch_size, args.duplicates, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""MT103 extraction regression check against a recorded corpus.
+
+``benchmarks/fixtures/mt103/corpus.json`` holds MT103 messages together with
+the fields the per-field regex extractors returned for them, before the
+single-pass tokenizer replaced those extractors. The corpus mixes
+well-formed messages (CRLF, Cyrillic names, INN / KPP lines) with malformed
+ones: missing or repeated tags, tags inside free text, LF / CR / blank-line
+separators, invalid dates, truncated and empty messages. Every message is
+parsed with the current ``extract_mt103_data`` and compared field by field;
+the per-message parse time is reported. Runs offline; exits non-zero on any
+difference.
+
+    python -m benchmarks.mt103_regression
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mt103", "corpus.json")
+
+
+def check_corpus(corpus, repeat: int):
+    """Differences from the recorded fields, and the time of ``repeat`` passes over the corpus."""
+    from app.services.swift_service import extract_mt103_data
+
+    # The extractor prints unparsable dates; the corpus has plenty of those
+    with contextlib.redirect_stdout(io.StringIO()):
+        failures = []
+        for position, case in enumerate(corpus):
+            result = extract_mt103_data(case["message"])
+            if result != case["expected"]:
+                fields = sorted(field for field in set(result) | set(case["expected"])
+                                if result.get(field) != case["expected"].get(field))
+                failures.append((position, fields, result, case["expected"]))
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for case in corpus:
+                extract_mt103_data(case["message"])
+        elapsed = time.perf_counter() - started
+    return failures, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare MT103 extraction with the recorded corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing passes over the corpus")
+    parser.add_argument("--show", type=int, default=10, help="Differences to print")
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding="utf-8") as corpus_file:
+        corpus = json.load(corpus_file)
+
+    with tempfile.TemporaryDirectory(prefix="mt103-regression-") as workdir:
+        # The service creates ./data/swift_messages.db when imported; keep that
+        # out of the working tree
+        os.makedirs(os.path.join(workdir, "data"))
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            failures, elapsed = check_corpus(corpus, args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    for position, fields, result, expected in failures[:args.show]:
+        print(f"FAIL message {position}: {', '.join(fields)}")
+        for field in fields:
+            print(f"    {field}: got {result.get(field)!r}, expected {expected.get(field)!r}")
+    print(f"{len(corpus)} messages, {len(failures)} differences, "
+          f"{elapsed / (len(corpus) * args.repeat) * 1e6:.1f} us/message")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
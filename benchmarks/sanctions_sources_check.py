@@ -0,0 +1,107 @@
+"""Parse check of the EU, UN and UK sanctions list readers on small fixture files.
+
+Each fixture in ``benchmarks/fixtures/sanctions`` is parsed with its
+``SanctionsSource`` and compared entry by entry with ``expected.json``. The
+fixtures are then applied together with a small synthetic OFAC list through
+``SDNService.apply_sources_update`` in a scratch data directory, and the
+resulting shared index is screened for every fixture entry by name, alias and
+identifier. A second update of one list alone must carry the others over
+unchanged. Runs offline; exits non-zero on the first failing list.
+
+    python -m benchmarks.sanctions_sources_check
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "sanctions")
+FIXTURE_FILES = {"EU": "eu.xml", "UN": "un.xml", "UK": "uk.csv"}
+EXPECTED_PATH = os.path.join(FIXTURES_DIR, "expected.json")
+OFAC_ENTRIES = 50
+
+
+def check_parsing(expected: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    from app.services.sanctions_sources import configured_sources
+
+    failures = []
+    for source in configured_sources(list(FIXTURE_FILES)):
+        entries = list(source.iter_entries(os.path.join(FIXTURES_DIR, FIXTURE_FILES[source.name])))
+        if entries != expected[source.name]:
+            for position, (entry, wanted) in enumerate(zip(entries, expected[source.name])):
+                if entry != wanted:
+                    failures.append(f"{source.name} entry {position}: got {entry}, expected {wanted}")
+            if len(entries) != len(expected[source.name]):
+                failures.append(f"{source.name}: {len(entries)} entries, expected {len(expected[source.name])}")
+        print(f"{source.name}: parsed {len(entries)} entries")
+    return failures
+
+
+def check_shared_index(expected: Dict[str, List[Dict[str, Any]]], workdir: str) -> List[str]:
+    # sdn_service reads its data directory and source list at import time
+    os.chdir(workdir)
+    os.environ["SANCTIONS_SOURCES"] = ",".join(["OFAC"] + list(FIXTURE_FILES))
+    from app.services.sdn_service import SDNService, MATCH_THRESHOLD
+    from benchmarks.generate_sdn_xml import generate_sdn_xml
+
+    ofac_path = os.path.join(workdir, "sdn.xml")
+    generate_sdn_xml(ofac_path, OFAC_ENTRIES, seed=1)
+    paths = {name: os.path.join(FIXTURES_DIR, file_name) for name, file_name in FIXTURE_FILES.items()}
+    paths["OFAC"] = ofac_path
+
+    failures = []
+    delta = SDNService.apply_sources_update(paths)
+    fixture_count = sum(len(entries) for entries in expected.values())
+    if len(delta["added"]) != OFAC_ENTRIES + fixture_count:
+        failures.append(f"First update added {len(delta['added'])} entries, expected {OFAC_ENTRIES + fixture_count}")
+
+    index = SDNService.get_index()
+    uids = [index.entries[position]['uid'] for position in range(len(index))]
+    if len(set(uids)) != len(uids):
+        failures.append("uids are not unique across the lists")
+
+    for source_name, entries in expected.items():
+        for entry in entries:
+            for name in [entry['name']] + entry['aka_names']:
+                result = SDNService._screen(index, SDNService._clean_query(name), MATCH_THRESHOLD)
+                if not any(match['name'] == entry['name'] and match['source'] == source_name
+                           for match in result["results"]):
+                    failures.append(f"{source_name}: screening {name!r} does not find {entry['name']!r}")
+            for id_info in entry['ids']:
+                result = SDNService.search_by_identifier(id_info['id_number'])
+                if not any(match['name'] == entry['name'] for match in result["results"]):
+                    failures.append(f"{source_name}: identifier {id_info['id_number']} does not find {entry['name']!r}")
+
+    # Re-applying one list alone carries the others over untouched
+    delta = SDNService.apply_sources_update({"UK": paths["UK"]})
+    if delta["added"] or delta["removed"] or delta["changed"] or delta["entries_count"] != len(uids):
+        failures.append(f"Re-applying UK changed the index: {delta}")
+    print(f"Shared index: {len(uids)} entries from {', '.join(sorted(paths))}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the sanctions list readers on fixture files")
+    parser.parse_args()
+
+    with open(EXPECTED_PATH, encoding="utf-8") as expected_file:
+        expected = json.load(expected_file)
+    failures = check_parsing(expected)
+    with tempfile.TemporaryDirectory(prefix="sanctions-check-") as workdir:
+        cwd = os.getcwd()
+        try:
+            failures += check_shared_index(expected, workdir)
+        finally:
+            os.chdir(cwd)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Equivalence check of ``BoundedScorer`` against ``difflib.SequenceMatcher``.
+
+``BoundedScorer(query, threshold).score(key)`` must return exactly
+``SequenceMatcher(None, query, key).ratio()`` whenever that ratio reaches the
+threshold, and 0.0 otherwise. Random pairs are drawn so that many of them sit
+close to the threshold: unrelated strings over small alphabets, near copies
+with a few edits, and pairs of normalized name-like strings. Exits non-zero on
+the first mismatches.
+
+    python -m benchmarks.scorer_equivalence --pairs 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.sdn_scoring import BoundedScorer  # noqa: E402
+
+ALPHABETS = ("ab", "abc", "abcde ", "aeiou bdkmnrstv", "abcdefghijklmnopqrstuvwxyz '-", "ivanpetrov ")
+THRESHOLDS = (0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0)
+
+
+def _random_string(rng: random.Random, alphabet: str, max_length: int) -> str:
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+
+def _edit(rng: random.Random, text: str, alphabet: str) -> str:
+    chars = list(text)
+    for _ in range(rng.randint(1, 4)):
+        operation = rng.random()
+        i = rng.randint(0, len(chars))
+        if operation < 0.35 or not chars:
+            chars.insert(i, rng.choice(alphabet))
+        elif i < len(chars) and operation < 0.7:
+            chars[i] = rng.choice(alphabet)
+        elif i < len(chars):
+            del chars[i]
+    return "".join(chars)
+
+
+def random_pair(rng: random.Random):
+    alphabet = rng.choice(ALPHABETS)
+    # Long enough to cross difflib's autojunk cutoff (200) now and then
+    max_length = rng.choice((4, 12, 40, 250))
+    query = _random_string(rng, alphabet, max_length)
+    kind = rng.random()
+    if kind < 0.4:
+        key = _random_string(rng, alphabet, max_length)
+    elif kind < 0.9:
+        key = _edit(rng, query, alphabet)
+    else:
+        key = query
+    if rng.random() < 0.5:
+        query, key = key, query
+    threshold = rng.choice(THRESHOLDS) if rng.random() < 0.7 else round(rng.uniform(0.3, 1.0), 4)
+    return query, key, threshold
+
+
+def check(pairs: int, seed: int, max_failures: int = 10) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    above_threshold = 0
+    checked = 0
+    for checked in range(1, pairs + 1):
+        query, key, threshold = random_pair(rng)
+        ratio = SequenceMatcher(None, query, key).ratio()
+        expected = ratio if ratio >= threshold else 0.0
+        actual = BoundedScorer(query, threshold).score(key)
+        above_threshold += expected > 0
+        if actual != expected:
+            failures += 1
+            print(f"MISMATCH query={query!r} key={key!r} threshold={threshold}: "
+                  f"difflib {expected!r}, BoundedScorer {actual!r}")
+            if failures >= max_failures:
+                break
+    print(f"{checked} pairs ({above_threshold} at or above their threshold), {failures} mismatches")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check BoundedScorer against difflib on random pairs")
+    parser.add_argument("--pairs", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    failures = check(args.pairs, args.seed)
+    print(f"Checked in {time.perf_counter() - started:.1f}s")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
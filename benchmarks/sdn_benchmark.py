@@ -0,0 +1,314 @@
+"""SDN screening benchmark and accuracy regression check.
+
+Generates (or reuses) an SDN.XML, builds the index the way the service does
+(the XML streamed into a JSON cache, the cache streamed into a snapshot),
+screens a corpus of exact, transliterated, misspelled and absent names and
+reports latency percentiles, throughput and recall. For a sample of queries
+the results are also compared with the original screening: a full scan that
+scores every entry with ``difflib.SequenceMatcher``, without any candidate
+index or bounded scorer, as the reference for recall / precision. Runs offline.
+
+    python -m benchmarks.sdn_benchmark --entries 100000 --queries 500
+    python -m benchmarks.sdn_benchmark --xml data/sdn.xml --json results.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unidecode import unidecode  # noqa: E402
+
+from app.services.sdn_index import SDNIndex, SCREENING_ID_TYPES, iter_cache_entries  # noqa: E402
+from app.services.sdn_service import SDNService, MATCH_THRESHOLD  # noqa: E402
+from app.services.sdn_snapshot import MappedSDNIndex  # noqa: E402
+from benchmarks.generate_sdn_xml import generate_sdn_xml  # noqa: E402
+
+# Spelling rewrites seen between romanizations of the same name
+TRANSLITERATIONS = [
+    ("kh", "h"), ("yu", "iu"), ("iy", "y"), ("ya", "ia"), ("zh", "j"), ("ev", "yev"),
+    ("ov", "off"), ("sh", "sch"), ("u", "ou"), ("aev", "ayev"), ("j", "dzh"), ("ts", "tz"),
+]
+CATEGORIES = ("exact", "transliterated", "misspelled", "absent")
+
+
+def _transliterate(name: str, rng: random.Random) -> Optional[str]:
+    lowered = name.lower()
+    options = [(source, target) for source, target in TRANSLITERATIONS if source in lowered]
+    if not options:
+        return None
+    for source, target in rng.sample(options, min(len(options), rng.randint(1, 2))):
+        lowered = lowered.replace(source, target, 1)
+    return lowered
+
+
+def _misspell(name: str, rng: random.Random) -> Optional[str]:
+    chars = list(name.lower())
+    if len(chars) < 6:
+        return None
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(1, len(chars) - 1)
+        operation = rng.random()
+        if operation < 0.3:
+            del chars[i]
+        elif operation < 0.6:
+            chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif operation < 0.8:
+            chars.insert(i, rng.choice("aeiou"))
+        else:
+            chars[i - 1], chars[i] = chars[i], chars[i - 1]
+    return "".join(chars)
+
+
+def build_query_corpus(index: SDNIndex, count: int, seed: int) -> List[Dict[str, Any]]:
+    """``count`` queries spread over CATEGORIES, each with the entry it was derived from."""
+    rng = random.Random(seed)
+    queries = []
+    per_category = max(1, count // len(CATEGORIES))
+    for category in CATEGORIES:
+        attempts = 0
+        produced = 0
+        while produced < per_category and attempts < per_category * 20:
+            attempts += 1
+            if category == "absent":
+                length = rng.randint(2, 3)
+                query = " ".join("".join(rng.choice("bcdfgqwxz") + rng.choice("aeiouy") for _ in range(3))
+                                 for _ in range(length))
+                queries.append({"category": category, "query": query, "target": None})
+                produced += 1
+                continue
+
+            position = rng.randrange(len(index))
+            entry = index.entries[position]
+            name = rng.choice([entry['name']] + entry.get('aka_names', []))
+            if category == "exact":
+                query = name
+            elif category == "transliterated":
+                query = _transliterate(name, rng)
+            else:
+                query = _misspell(name, rng)
+            if query:
+                queries.append({"category": category, "query": query, "target": _result_key(entry)})
+                produced += 1
+    return queries
+
+
+def _result_key(entry: Dict[str, Any]) -> str:
+    return json.dumps([entry['name'], entry.get('aka_names', [])])
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(percent / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def baseline_screen(index: SDNIndex, query: str, threshold: float) -> List[Dict[str, Any]]:
+    """Reference results: the original full scan, ``SequenceMatcher`` against every entry.
+
+    This is the screening the service did before any candidate index or
+    bounded scorer existed; ``query`` is already cleaned by ``_clean_query``.
+    """
+    query_tokens = [unidecode(token) for token in query.split()]
+    results = []
+    for position in range(len(index)):
+        entry = index.entries[position]
+        entry_name = unidecode(entry['name'].lower())
+        aka_names = [unidecode(aka.lower()) for aka in entry.get('aka_names', [])]
+        ids = [id_info for id_info in entry.get('ids', []) if id_info['id_type'] in SCREENING_ID_TYPES]
+
+        primary_score = SequenceMatcher(None, query, entry_name).ratio()
+        aka_scores = [SequenceMatcher(None, query, aka).ratio() for aka in aka_names]
+        best_score = max([primary_score] + aka_scores)
+        is_exact = (best_score == 1.0 or all(token in entry_name for token in query_tokens) or
+                    any(all(token in aka for token in query_tokens) for aka in aka_names) or
+                    any(all(token in unidecode(id_info['id_number'].lower()) for token in query_tokens)
+                        for id_info in ids))
+        if best_score >= threshold or is_exact:
+            results.append({**entry, "match_score": 1.0 if is_exact else best_score})
+    return results
+
+
+def load_index(xml_path: str, workdir: str, mapped: bool) -> SDNIndex:
+    """Write the JSON cache of ``xml_path`` and build the snapshot from it, as ``parse_xml_to_json`` does.
+
+    Without ``mapped`` the cache is loaded into an in-memory ``SDNIndex`` instead.
+    """
+    cache_path = os.path.join(workdir, "sdn_cache.json")
+    _, version = SDNService._write_cache(SDNService.iter_xml_entries(xml_path), cache_path)
+    if not mapped:
+        return SDNIndex(list(iter_cache_entries(cache_path)), version)
+    snapshot_path = os.path.join(workdir, "sdn_index.snap")
+    SDNService.build_snapshot(cache_path, snapshot_path)
+    return MappedSDNIndex(snapshot_path)
+
+
+def run_benchmark(index: SDNIndex, queries: List[Dict[str, Any]], threshold: float, limit: Optional[int],
+                  baseline_queries: int, seed: int) -> Dict[str, Any]:
+    # Warm up the page cache and lazily built structures
+    for item in queries[:10]:
+        SDNService._screen(index, SDNService._clean_query(item["query"]), threshold, limit)
+
+    by_category: Dict[str, Dict[str, Any]] = {}
+    all_latencies = []
+    started = time.perf_counter()
+    outcomes = []
+    for item in queries:
+        query = SDNService._clean_query(item["query"])
+        query_started = time.perf_counter()
+        result = SDNService._screen(index, query, threshold, limit)
+        elapsed = time.perf_counter() - query_started
+        all_latencies.append(elapsed)
+        outcomes.append((item, query, result))
+
+        stats = by_category.setdefault(item["category"], {"latencies": [], "targets": 0, "found": 0, "results": 0})
+        stats["latencies"].append(elapsed)
+        stats["results"] += len(result["results"])
+        if item["target"] is not None:
+            stats["targets"] += 1
+            if any(_result_key(entry) == item["target"] for entry in result["results"]):
+                stats["found"] += 1
+    total_seconds = time.perf_counter() - started
+
+    report = {
+        "entries": len(index),
+        "queries": len(queries),
+        "threshold": threshold,
+        "limit": limit,
+        "throughput_qps": len(queries) / total_seconds if total_seconds else 0.0,
+        "overall": {
+            **_latency_summary(all_latencies),
+            "mean_results": sum(len(result["results"]) for _, _, result in outcomes) / len(outcomes),
+        },
+        "categories": {},
+    }
+    for category, stats in by_category.items():
+        report["categories"][category] = {
+            "queries": len(stats["latencies"]),
+            **_latency_summary(stats["latencies"]),
+            "mean_results": stats["results"] / len(stats["latencies"]),
+            "target_recall": stats["found"] / stats["targets"] if stats["targets"] else None,
+        }
+
+    if baseline_queries:
+        report["baseline"] = compare_with_baseline(index, outcomes, threshold, limit, baseline_queries, seed)
+    return report
+
+
+def _latency_summary(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": _percentile(ordered, 50) * 1000,
+        "p95_ms": _percentile(ordered, 95) * 1000,
+        "p99_ms": _percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+def compare_with_baseline(index: SDNIndex, outcomes, threshold: float, limit: Optional[int],
+                          sample: int, seed: int) -> Dict[str, Any]:
+    """Recall / precision of exact and fuzzy matches against the original full-scan screening.
+
+    Transliteration and phonetic matches have no counterpart in the
+    reference and are counted separately. With a ``limit`` only the top of
+    the reference is expected. ``average_match_score`` must equal the
+    reference's, whatever spelling variants were found on top.
+    """
+    rng = random.Random(seed)
+    sampled = rng.sample(outcomes, min(sample, len(outcomes)))
+    expected_total = returned_total = agreed_total = variant_total = average_mismatches = 0
+    baseline_seconds = 0.0
+    for _, query, result in sampled:
+        started = time.perf_counter()
+        reference = baseline_screen(index, query, threshold)
+        baseline_seconds += time.perf_counter() - started
+        scores = [entry['match_score'] for entry in reference]
+        reference_average = 1.0 if 1.0 in scores else (sum(scores) / len(scores) if scores else 0.0)
+        if abs(result["average_match_score"] - reference_average) > 1e-9:
+            average_mismatches += 1
+        reference.sort(key=lambda entry: entry['match_score'], reverse=True)
+        if limit is not None:
+            reference = reference[:limit]
+
+        expected = {(_result_key(entry), round(entry['match_score'], 9)) for entry in reference}
+        returned = {(_result_key(entry), round(entry['match_score'], 9)) for entry in result["results"]
+                    if entry['match_type'] in ("exact", "fuzzy")}
+        variant_total += sum(entry['match_type'] not in ("exact", "fuzzy") for entry in result["results"])
+        expected_total += len(expected)
+        returned_total += len(returned)
+        agreed_total += len(expected & returned)
+
+    return {
+        "queries": len(sampled),
+        "recall": agreed_total / expected_total if expected_total else 1.0,
+        "precision": agreed_total / returned_total if returned_total else 1.0,
+        "variant_only_results": variant_total,
+        "average_mismatches": average_mismatches,
+        "baseline_mean_ms": baseline_seconds / len(sampled) * 1000 if sampled else 0.0,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"SDN entries: {report['entries']}, queries: {report['queries']}, "
+          f"threshold: {report['threshold']}, limit: {report['limit']}")
+    print(f"Throughput: {report['throughput_qps']:.1f} queries/s")
+    header = f"{'category':<16}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'results':>10}{'recall':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["categories"].items()) + [("overall", {"queries": report["queries"], **report["overall"]})]
+    for category, stats in rows:
+        recall = stats.get("target_recall")
+        print(f"{category:<16}{stats['queries']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+              f"{stats['p99_ms']:>10.2f}{stats.get('mean_results', 0):>10.1f}"
+              f"{'' if recall is None else format(recall, '.3f'):>9}")
+    baseline = report.get("baseline")
+    if baseline:
+        print(f"Against the original full-scan SequenceMatcher screening ({baseline['queries']} queries, "
+              f"{baseline['baseline_mean_ms']:.1f} ms/query): recall {baseline['recall']:.4f}, "
+              f"precision {baseline['precision']:.4f}, variant-only results {baseline['variant_only_results']}, "
+              f"average score mismatches {baseline['average_mismatches']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SDN screening latency and accuracy")
+    parser.add_argument("--entries", type=int, default=10000, help="Synthetic list size (ignored with --xml)")
+    parser.add_argument("--xml", help="Use an existing SDN.XML instead of generating one")
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--baseline-queries", type=int, default=50,
+                        help="Queries also run through the full-scan reference (0 to skip)")
+    parser.add_argument("--in-memory", action="store_true", help="Screen the in-memory index instead of a snapshot")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="sdn-benchmark-") as workdir:
+        xml_path = args.xml
+        if xml_path is None:
+            xml_path = os.path.join(workdir, "sdn.xml")
+            started = time.perf_counter()
+            generate_sdn_xml(xml_path, args.entries, args.seed)
+            print(f"Generated {args.entries} entries in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        index = load_index(xml_path, workdir, mapped=not args.in_memory)
+        print(f"Built index in {time.perf_counter() - started:.1f}s")
+
+        queries = build_query_corpus(index, args.queries, args.seed)
+        report = run_benchmark(index, queries, args.threshold, args.limit, args.baseline_queries, args.seed)
+        print_report(report)
+        if args.json:
+            with open(args.json, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
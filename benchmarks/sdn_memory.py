@@ -0,0 +1,115 @@
+"""Per-worker memory of the SDN list, as workers held it before and as they serve it now.
+
+Each representation is loaded in a fresh interpreter and the growth of its
+RSS is reported, split into private (anonymous) memory, which every worker
+pays for itself, and file-backed pages, which all workers mapping the same
+file share through the page cache:
+
+- ``dicts``: parsed entries as nested dicts (a worker loading the JSON cache),
+- ``index``: a full in-memory ``SDNIndex`` (entries, match keys, n-grams),
+- ``mapped``: the mmap snapshot ``SDNService.get_index`` serves, after
+  screening a query corpus and reading every entry once, as ``/list`` does.
+
+    python -m benchmarks.sdn_memory --entries 100000
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ("dicts", "index", "mapped")
+SERVED_QUERIES = 200
+
+
+def current_rss_bytes() -> Dict[str, int]:
+    """Private (``RssAnon``) and shared file-backed (``RssFile``) resident bytes."""
+    rss = {}
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(("RssAnon:", "RssFile:")):
+                rss[line.split(":")[0]] = int(line.split()[1]) * 1024
+    if len(rss) != 2:
+        raise RuntimeError("RssAnon / RssFile not available")
+    return rss
+
+
+def _growth(before: Dict[str, int]) -> Dict[str, int]:
+    gc.collect()
+    after = current_rss_bytes()
+    return {"private": after["RssAnon"] - before["RssAnon"], "shared": after["RssFile"] - before["RssFile"]}
+
+
+def measure(mode: str, xml_path: str, snapshot_path: str) -> Dict[str, int]:
+    from app.services.sdn_index import SDNIndex
+    from app.services.sdn_service import SDNService, MATCH_THRESHOLD
+    from app.services.sdn_snapshot import MappedSDNIndex
+    from benchmarks.sdn_benchmark import build_query_corpus
+
+    if mode == "mapped":
+        gc.collect()
+        before = current_rss_bytes()
+        index = MappedSDNIndex(snapshot_path)
+        for item in build_query_corpus(index, SERVED_QUERIES, seed=1):
+            SDNService._screen(index, SDNService._clean_query(item["query"]), MATCH_THRESHOLD)
+        for _ in SDNService.iter_entries(index):
+            pass
+        return _growth(before)
+
+    # Entries are serialized up front so parser garbage is not measured
+    lines = [json.dumps(entry) for entry in SDNService.iter_xml_entries(xml_path)]
+    gc.collect()
+    before = current_rss_bytes()
+    entries = [json.loads(line) for line in lines]
+    if mode == "index":
+        entries = SDNIndex(entries, "memory")
+    return _growth(before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-worker SDN list memory per representation")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--xml", help="Use an existing SDN.XML instead of generating one")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.xml, args.snapshot)))
+        return
+
+    from app.services.sdn_service import SDNService
+    from benchmarks.generate_sdn_xml import generate_sdn_xml
+
+    with tempfile.TemporaryDirectory(prefix="sdn-memory-") as workdir:
+        xml_path = args.xml
+        if xml_path is None:
+            xml_path = os.path.join(workdir, "sdn.xml")
+            generate_sdn_xml(xml_path, args.entries, seed=1)
+        # Built the way the service does: XML -> JSON cache -> streamed snapshot
+        cache_path = os.path.join(workdir, "sdn_cache.json")
+        snapshot_path = os.path.join(workdir, "sdn_index.snap")
+        entries_count, _ = SDNService._write_cache(SDNService.iter_xml_entries(xml_path), cache_path)
+        SDNService.build_snapshot(cache_path, snapshot_path)
+
+        print(f"SDN entries: {entries_count}")
+        print(f"{'mode':<10}{'private MiB':>13}{'shared MiB':>12}{'private B/entry':>17}")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.sdn_memory", "--mode", mode,
+                 "--xml", xml_path, "--snapshot", snapshot_path],
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                capture_output=True, text=True, check=True,
+            ).stdout.splitlines()
+            growth = json.loads(output[-1])
+            print(f"{mode:<10}{growth['private'] / 2 ** 20:>13.1f}{growth['shared'] / 2 ** 20:>12.1f}"
+                  f"{growth['private'] / entries_count:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
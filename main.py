@@ -3,6 +3,7 @@ from flask_cors import CORS
 import os
 import logging
 from datetime import datetime
+from multiprocessing import parent_process
 
 # Configure logging
 logging.basicConfig(
@@ -19,11 +20,17 @@ from app.routes.sdn_routes import sdn_blueprint
 from app.routes.auth_routes import auth_blueprint
 from app.services.swift_service import initialize_db  # Example import
 from app.services.auth_service import AuthService
+from app.services.sdn_refresher import SDNRefresher
 
 # Initialize database
 initialize_db()
 AuthService.initialize_db()
 
+# Keep the SDN list fresh in the background instead of on the request path
+# (not from SDN screening pool processes, which re-import this module)
+if os.getenv("SDN_BACKGROUND_REFRESH", "True").lower() == "true" and parent_process() is None:
+    SDNRefresher.start()
+
 # Register blueprints
 app.register_blueprint(swift_blueprint, url_prefix="/api/swift")
 app.register_blueprint(sdn_blueprint, url_prefix="/api/sdn")
@@ -42,10 +49,13 @@ def home():
                     "base": "/api/swift",
                     "routes": [
                         "/process-swift",
+                        "/process-swift-file",
                         "/parsed-swift-files",
                         "/search-orginfo",
                         "/search-egrul",
                         "/search-swift",
+                        "/search-messages",
+                        "/lookup-messages",
                     ],
                 },
                 "sdn": {"base": "/api/sdn", "routes": ["/list", "/update"]},